@@ -1,11 +1,16 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 import os
-import uuid
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
+import orjson
+import redis.asyncio as redis
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 from models.schemas import (
@@ -13,11 +18,11 @@ from models.schemas import (
     JobAnalysis,
     ResumeAnalysis,
     SkillGap,
-    GeneratedDocument,
-    UploadResponse,
     EmailRequest,
     EmailResponse,
     AgentRequest,
+    AgentBatchRequest,
+    AgentPlanRequest,
     AgentResponse,
     EvaluationRequest,
     EvaluationResponse
@@ -26,9 +31,6 @@ from services.pdf_parser import PDFParser
 from services.gemini_service import GeminiService
 from services.skill_analyzer import SkillAnalyzer
 from services.document_generator import DocumentGenerator
-from services.email_service import EmailService
-from services.agent_service import CareerAgentService
-from services.agent_evaluator import AgentEvaluator, BenchmarkComparison
 
 # Load environment variables
 load_dotenv()
@@ -43,11 +45,15 @@ logger = logging.getLogger(__name__)
 # Get base directory for resolving paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Uploaded documents the agent plan is allowed to read
+UPLOAD_DIR = os.path.realpath(os.path.join(BASE_DIR, "uploads"))
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Automated Career Assistant API",
     description="AI-powered resume tailoring and cover letter generation",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -64,13 +70,228 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     logger.warning("GEMINI_API_KEY not found in environment variables")
 
-gemini_service = GeminiService(GEMINI_API_KEY) if GEMINI_API_KEY else None
+# Shared with the agent, so analyses cached by the API are reused by its tools
+gemini_service = GeminiService(GEMINI_API_KEY, cache_size=512, cache_ttl=3600) if GEMINI_API_KEY else None
 pdf_parser = PDFParser()
 skill_analyzer = SkillAnalyzer()
 document_generator = DocumentGenerator(output_dir=os.path.join(BASE_DIR, "generated"))
 
 # In-memory storage for analysis results (in production, use a database)
-analysis_store = {}
+# Keyed by a digest of the uploaded resume + job description bytes so that
+# re-submitting the same pair skips parsing and the Gemini round-trips.
+# Entries expire after an hour and the least recently used ones are evicted
+# once the store is full, so memory stays bounded for long-running servers.
+ANALYSIS_STORE_MAX_SIZE = 256
+ANALYSIS_STORE_TTL = 3600
+
+analysis_store = TTLCache(maxsize=ANALYSIS_STORE_MAX_SIZE, ttl=ANALYSIS_STORE_TTL)
+analysis_store_lock = asyncio.Lock()
+
+# With several uvicorn workers the in-process store is not shared, so set
+# REDIS_URL to keep analyses in Redis where every worker can see them
+REDIS_URL = os.getenv("REDIS_URL")
+redis_client = redis.from_url(REDIS_URL) if REDIS_URL else None
+
+async def get_analysis(analysis_id: str) -> Optional[dict]:
+    """
+    Look up a stored analysis
+    
+    Args:
+        analysis_id: Analysis ID
+        
+    Returns:
+        Stored entry with the AnalysisResult and extracted texts, or None
+    """
+    if redis_client is not None:
+        raw = await redis_client.get(f"analysis:{analysis_id}")
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        entry["result"] = AnalysisResult.model_validate(entry["result"])
+        return entry
+    
+    async with analysis_store_lock:
+        return analysis_store.get(analysis_id)
+
+async def put_analysis(analysis_id: str, entry: dict) -> None:
+    """
+    Store an analysis so later requests (on any worker) can reuse it
+    
+    Args:
+        analysis_id: Analysis ID
+        entry: Entry with the AnalysisResult and extracted texts
+    """
+    if redis_client is not None:
+        payload = json.dumps({**entry, "result": entry["result"].model_dump(mode="json")})
+        await redis_client.set(f"analysis:{analysis_id}", payload, ex=ANALYSIS_STORE_TTL)
+        return
+    
+    async with analysis_store_lock:
+        analysis_store[analysis_id] = entry
+
+# Uploads are read in fixed-size chunks and capped in size
+UPLOAD_CHUNK_SIZE = 1 << 16
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+PDF_MAGIC = b"%PDF-"
+
+async def read_upload(upload: UploadFile) -> bytes:
+    """
+    Read an uploaded PDF into memory, enforcing MAX_UPLOAD_SIZE
+    
+    Args:
+        upload: Uploaded file
+        
+    Returns:
+        Raw file contents
+    """
+    # Check the PDF signature up front instead of trusting the file extension
+    first_chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+    if not first_chunk.startswith(PDF_MAGIC):
+        raise HTTPException(status_code=400, detail=f"{upload.filename} is not a valid PDF file")
+    
+    chunks = [first_chunk]
+    size = len(first_chunk)
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{upload.filename} exceeds the {MAX_UPLOAD_SIZE // (1024 * 1024)} MB upload limit"
+            )
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def read_pdf_uploads(
+    resume: UploadFile,
+    job_description: UploadFile
+) -> Tuple[bytes, bytes]:
+    """
+    Validate and read the resume and job description uploads concurrently
+    
+    Args:
+        resume: Resume PDF file
+        job_description: Job description PDF file
+        
+    Returns:
+        Tuple of (resume_bytes, job_bytes)
+    """
+    # Read uploaded files into memory (read_upload checks the PDF signature)
+    return await asyncio.gather(
+        read_upload(resume),
+        read_upload(job_description)
+    )
+
+async def extract_pdf_texts(
+    resume_bytes: bytes,
+    job_bytes: bytes,
+    resume_name: str,
+    job_name: str
+) -> Tuple[str, str]:
+    """
+    Extract text from the resume and job description PDFs concurrently
+    
+    Args:
+        resume_bytes: Raw resume PDF
+        job_bytes: Raw job description PDF
+        resume_name: Resume filename, used in log messages
+        job_name: Job description filename, used in log messages
+        
+    Returns:
+        Tuple of (resume_text, job_text)
+    """
+    logger.info("Extracting text from PDFs...")
+    resume_text, job_text = await asyncio.gather(
+        pdf_parser.extract_text_from_bytes(resume_bytes, resume_name),
+        pdf_parser.extract_text_from_bytes(job_bytes, job_name)
+    )
+    
+    if not resume_text:
+        raise HTTPException(status_code=400, detail="Could not extract text from resume")
+    if not job_text:
+        raise HTTPException(status_code=400, detail="Could not extract text from job description")
+    
+    return resume_text, job_text
+
+async def ingest_resume_and_jd(
+    resume: UploadFile,
+    job_description: UploadFile
+) -> Tuple[str, str]:
+    """
+    Validate, read and parse the resume and job description uploads
+    
+    Args:
+        resume: Resume PDF file
+        job_description: Job description PDF file
+        
+    Returns:
+        Tuple of (resume_text, job_text)
+    """
+    resume_bytes, job_bytes = await read_pdf_uploads(resume, job_description)
+    return await extract_pdf_texts(
+        resume_bytes,
+        job_bytes,
+        resume.filename,
+        job_description.filename
+    )
+
+# Media types for generated documents
+DOCUMENT_MEDIA_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf"
+}
+
+async def write_generated_document(kind: str, content: str, format: str) -> FileResponse:
+    """
+    Write generated content to a document and return it as a file response
+    
+    Args:
+        kind: Document kind ("resume" or "cover_letter")
+        content: Generated document content
+        format: Output format (docx or pdf)
+        
+    Returns:
+        FileResponse for the generated document
+    """
+    label = kind.replace("_", " ")
+    
+    # Use fixed filename and delete old ones
+    filename = f"latest_{kind}.{format}"
+    file_path_to_delete = os.path.join(BASE_DIR, "generated", filename)
+    
+    # Delete old document if exists
+    if os.path.exists(file_path_to_delete):
+        os.remove(file_path_to_delete)
+        logger.info("Deleted old %s: %s", label, filename)
+    
+    # Generate new document
+    generators = {
+        ("resume", "docx"): document_generator.generate_docx_resume,
+        ("resume", "pdf"): document_generator.generate_pdf_resume,
+        ("cover_letter", "docx"): document_generator.generate_docx_cover_letter,
+        ("cover_letter", "pdf"): document_generator.generate_pdf_cover_letter
+    }
+    # python-docx and reportlab are synchronous, so run them off the event loop
+    file_path = await asyncio.to_thread(generators[(kind, format)], content, filename)
+    
+    logger.info("%s generated: %s", label.capitalize(), filename)
+    
+    # Return file - pass the stat result so Starlette does not stat it again before sendfile
+    return FileResponse(
+        file_path,
+        media_type=DOCUMENT_MEDIA_TYPES[format],
+        filename=filename,
+        stat_result=os.stat(file_path),
+        content_disposition_type="attachment"
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release worker processes used for PDF parsing and open network connections"""
+    PDFParser.shutdown_pool()
+    if email_service_instance is not None:
+        await email_service_instance.close()
+    if redis_client is not None:
+        await redis_client.aclose()
 
 @app.get("/")
 async def root():
@@ -97,35 +318,27 @@ async def upload_and_analyze(
         Analysis results with skill gap and match percentage
     """
     try:
-        # Validate file types
-        if not resume.filename.endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Resume must be a PDF file")
-        if not job_description.filename.endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Job description must be a PDF file")
-        
-        # Generate unique IDs for files
-        resume_id = f"resume_{uuid.uuid4().hex}.pdf"
-        job_id = f"job_{uuid.uuid4().hex}.pdf"
-        
-        # Save uploaded files
-        resume_path = os.path.join("uploads", resume_id)
-        job_path = os.path.join("uploads", job_id)
-        
-        with open(resume_path, "wb") as f:
-            f.write(await resume.read())
-        
-        with open(job_path, "wb") as f:
-            f.write(await job_description.read())
+        # Read uploaded files into memory
+        resume_bytes, job_bytes = await read_pdf_uploads(resume, job_description)
+        
+        # Return the cached analysis if this exact pair was analyzed before
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(resume_bytes)
+        hasher.update(b"|")
+        hasher.update(job_bytes)
+        analysis_id = hasher.hexdigest()
+        cached = await get_analysis(analysis_id)
+        if cached is not None:
+            logger.info("Returning cached analysis: %s", analysis_id)
+            return cached["result"]
         
         # Extract text from PDFs
-        logger.info("Extracting text from PDFs...")
-        resume_text = await pdf_parser.extract_text_from_pdf(resume_path)
-        job_text = await pdf_parser.extract_text_from_pdf(job_path)
-        
-        if not resume_text:
-            raise HTTPException(status_code=400, detail="Could not extract text from resume")
-        if not job_text:
-            raise HTTPException(status_code=400, detail="Could not extract text from job description")
+        resume_text, job_text = await extract_pdf_texts(
+            resume_bytes,
+            job_bytes,
+            resume.filename,
+            job_description.filename
+        )
         
         # Check if Gemini service is available
         if not gemini_service:
@@ -133,12 +346,14 @@ async def upload_and_analyze(
         
         # Analyze documents with Gemini
         logger.info("Analyzing documents with AI...")
-        job_analysis_data = await gemini_service.analyze_job_description(job_text)
-        resume_analysis_data = await gemini_service.analyze_resume(resume_text)
+        job_analysis_data, resume_analysis_data = await asyncio.gather(
+            gemini_service.analyze_job_description(job_text),
+            gemini_service.analyze_resume(resume_text)
+        )
         
         # Create analysis objects
-        job_analysis = JobAnalysis(**job_analysis_data)
-        resume_analysis = ResumeAnalysis(**resume_analysis_data)
+        job_analysis = JobAnalysis.model_validate(job_analysis_data)
+        resume_analysis = ResumeAnalysis.model_validate(resume_analysis_data)
         
         # Analyze skill gap
         logger.info("Analyzing skill gaps...")
@@ -148,7 +363,7 @@ async def upload_and_analyze(
             resume_analysis.skills
         )
         
-        skill_gap = SkillGap(**skill_gap_data)
+        skill_gap = SkillGap.model_validate(skill_gap_data)
         
         # Calculate match percentage
         match_percentage = skill_analyzer.calculate_match_percentage(
@@ -158,28 +373,24 @@ async def upload_and_analyze(
         )
         
         # Create analysis result
-        analysis_result = AnalysisResult(
-            job_analysis=job_analysis,
-            resume_analysis=resume_analysis,
-            skill_gap=skill_gap,
-            match_percentage=match_percentage
-        )
-        
-        # Store analysis and file paths for later use
-        analysis_id = uuid.uuid4().hex
-        analysis_store[analysis_id] = {
+        analysis_result = AnalysisResult.model_validate({
+            "job_analysis": job_analysis,
+            "resume_analysis": resume_analysis,
+            "skill_gap": skill_gap,
+            "match_percentage": match_percentage,
+            "analysis_id": analysis_id
+        })
+        
+        # Store analysis and extracted texts for later use
+        entry = {
             "result": analysis_result,
-            "resume_path": resume_path,
-            "job_path": job_path,
             "resume_text": resume_text,
             "job_text": job_text
         }
         
-        # Clean up uploaded files (keep them for document generation)
-        # os.remove(resume_path)
-        # os.remove(job_path)
+        await put_analysis(analysis_id, entry)
         
-        logger.info(f"Analysis completed. Match: {match_percentage}%")
+        logger.info("Analysis completed. Match: %s%%", match_percentage)
         return analysis_result
         
     except HTTPException:
@@ -210,27 +421,8 @@ async def generate_resume(
         if format not in ["docx", "pdf"]:
             raise HTTPException(status_code=400, detail="Format must be 'docx' or 'pdf'")
         
-        # Generate unique IDs for files
-        resume_id = f"resume_{uuid.uuid4().hex}.pdf"
-        job_id = f"job_{uuid.uuid4().hex}.pdf"
-        
-        # Save uploaded files
-        resume_path = os.path.join("uploads", resume_id)
-        job_path = os.path.join("uploads", job_id)
-        
-        with open(resume_path, "wb") as f:
-            f.write(await resume.read())
-        
-        with open(job_path, "wb") as f:
-            f.write(await job_description.read())
-        
-        # Extract text from PDFs
-        logger.info("Extracting text from PDFs...")
-        resume_text = await pdf_parser.extract_text_from_pdf(resume_path)
-        job_text = await pdf_parser.extract_text_from_pdf(job_path)
-        
-        if not resume_text or not job_text:
-            raise HTTPException(status_code=400, detail="Could not extract text from files")
+        # Read and parse uploaded files
+        resume_text, job_text = await ingest_resume_and_jd(resume, job_description)
         
         # Check if Gemini service is available
         if not gemini_service:
@@ -238,38 +430,11 @@ async def generate_resume(
         
         # Generate tailored resume content
         logger.info("Generating tailored resume...")
-        tailored_content = await gemini_service.generate_tailored_resume(
-            resume_text,
-            job_text
-        )
-        
-        # Use fixed filename and delete old ones
-        filename = f"latest_resume.{format}"
-        file_path_to_delete = os.path.join(BASE_DIR, "generated", filename)
-        
-        # Delete old resume if exists
-        if os.path.exists(file_path_to_delete):
-            os.remove(file_path_to_delete)
-            logger.info(f"Deleted old resume: {filename}")
-        
-        # Generate new document
-        if format == "docx":
-            file_path = document_generator.generate_docx_resume(tailored_content, filename)
-        else:
-            file_path = document_generator.generate_pdf_resume(tailored_content, filename)
-        
-        # Clean up uploaded files
-        os.remove(resume_path)
-        os.remove(job_path)
+        # Generated together with the cover letter, which the UI asks for next
+        pack = await gemini_service.generate_application_pack(resume_text, job_text)
+        tailored_content = pack["resume"]
         
-        logger.info(f"Resume generated: {filename}")
-        
-        # Return file
-        return FileResponse(
-            file_path,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document" if format == "docx" else "application/pdf",
-            filename=filename
-        )
+        return await write_generated_document("resume", tailored_content, format)
         
     except HTTPException:
         raise
@@ -299,27 +464,8 @@ async def generate_cover_letter(
         if format not in ["docx", "pdf"]:
             raise HTTPException(status_code=400, detail="Format must be 'docx' or 'pdf'")
         
-        # Generate unique IDs for files
-        resume_id = f"resume_{uuid.uuid4().hex}.pdf"
-        job_id = f"job_{uuid.uuid4().hex}.pdf"
-        
-        # Save uploaded files
-        resume_path = os.path.join("uploads", resume_id)
-        job_path = os.path.join("uploads", job_id)
-        
-        with open(resume_path, "wb") as f:
-            f.write(await resume.read())
-        
-        with open(job_path, "wb") as f:
-            f.write(await job_description.read())
-        
-        # Extract text from PDFs
-        logger.info("Extracting text from PDFs...")
-        resume_text = await pdf_parser.extract_text_from_pdf(resume_path)
-        job_text = await pdf_parser.extract_text_from_pdf(job_path)
-        
-        if not resume_text or not job_text:
-            raise HTTPException(status_code=400, detail="Could not extract text from files")
+        # Read and parse uploaded files
+        resume_text, job_text = await ingest_resume_and_jd(resume, job_description)
         
         # Check if Gemini service is available
         if not gemini_service:
@@ -327,44 +473,87 @@ async def generate_cover_letter(
         
         # Generate cover letter content
         logger.info("Generating cover letter...")
-        cover_letter_content = await gemini_service.generate_cover_letter(
-            resume_text,
-            job_text
-        )
+        pack = await gemini_service.generate_application_pack(resume_text, job_text)
+        cover_letter_content = pack["cover_letter"]
         
-        # Use fixed filename and delete old ones
-        filename = f"latest_cover_letter.{format}"
-        file_path_to_delete = os.path.join(BASE_DIR, "generated", filename)
+        return await write_generated_document("cover_letter", cover_letter_content, format)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating cover letter: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating cover letter: {str(e)}")
+
+@app.post("/api/generate/{analysis_id}/{kind}")
+async def generate_from_analysis(
+    analysis_id: str,
+    kind: str,
+    format: str = Form("docx")
+):
+    """
+    Generate a tailored resume or cover letter from a previous analysis
+    
+    Reuses the text extracted by /api/upload-and-analyze, so the PDFs do not
+    have to be uploaded and parsed again.
+    
+    Args:
+        analysis_id: ID returned in the analysis result
+        kind: Document kind (resume or cover_letter)
+        format: Output format (docx or pdf)
         
-        # Delete old cover letter if exists
-        if os.path.exists(file_path_to_delete):
-            os.remove(file_path_to_delete)
-            logger.info(f"Deleted old cover letter: {filename}")
+    Returns:
+        Generated document file
+    """
+    try:
+        # Validate document kind and format
+        if kind not in ["resume", "cover_letter"]:
+            raise HTTPException(status_code=400, detail="Kind must be 'resume' or 'cover_letter'")
+        if format not in ["docx", "pdf"]:
+            raise HTTPException(status_code=400, detail="Format must be 'docx' or 'pdf'")
         
-        # Generate new document
-        if format == "docx":
-            file_path = document_generator.generate_docx_cover_letter(cover_letter_content, filename)
-        else:
-            file_path = document_generator.generate_pdf_cover_letter(cover_letter_content, filename)
+        entry = await get_analysis(analysis_id)
+        if entry is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Analysis not found or expired. Please upload the files again"
+            )
         
-        # Clean up uploaded files
-        os.remove(resume_path)
-        os.remove(job_path)
+        # Check if Gemini service is available
+        if not gemini_service:
+            raise HTTPException(status_code=500, detail="AI service not configured")
         
-        logger.info(f"Cover letter generated: {filename}")
+        # Generate document content; both documents come from one Gemini call
+        logger.info("Generating %s...", kind.replace("_", " "))
+        pack = await gemini_service.generate_application_pack(entry["resume_text"], entry["job_text"])
+        content = pack[kind]
         
-        # Return file
-        return FileResponse(
-            file_path,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document" if format == "docx" else "application/pdf",
-            filename=filename
-        )
+        return await write_generated_document(kind, content, format)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating cover letter: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error generating cover letter: {str(e)}")
+        logger.error(f"Error generating {kind} from analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating document: {str(e)}")
+
+# Initialize email service (lazy loading)
+email_service_instance = None
+
+def get_email_service():
+    """Get or create the shared email service"""
+    global email_service_instance
+    if email_service_instance is None:
+        # Get email configuration from environment
+        sender_email = os.getenv("SENDER_EMAIL")
+        sender_password = os.getenv("SENDER_PASSWORD")
+        if sender_email and sender_password:
+            from services.email_service import EmailService
+            email_service_instance = EmailService(
+                smtp_server=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+                smtp_port=int(os.getenv("SMTP_PORT", "587")),
+                sender_email=sender_email,
+                sender_password=sender_password
+            )
+    return email_service_instance
 
 @app.post("/api/send-email", response_model=EmailResponse)
 async def send_application_email(request: EmailRequest):
@@ -378,26 +567,13 @@ async def send_application_email(request: EmailRequest):
         EmailResponse with success status
     """
     try:
-        # Get email configuration from environment
-        smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        sender_email = os.getenv("SENDER_EMAIL")
-        sender_password = os.getenv("SENDER_PASSWORD")
-        
-        if not sender_email or not sender_password:
+        email_service = get_email_service()
+        if not email_service:
             raise HTTPException(
                 status_code=500,
                 detail="Email not configured. Please set SENDER_EMAIL and SENDER_PASSWORD"
             )
         
-        # Initialize email service
-        email_service = EmailService(
-            smtp_server=smtp_server,
-            smtp_port=smtp_port,
-            sender_email=sender_email,
-            sender_password=sender_password
-        )
-        
         # Validate recipient email
         if not email_service.validate_email(request.recipient_email):
             raise HTTPException(status_code=400, detail="Invalid recipient email address")
@@ -407,26 +583,15 @@ async def send_application_email(request: EmailRequest):
         
         # Helper function to resolve paths
         def resolve_path(path: str) -> Optional[str]:
-            """Resolve file path relative to BASE_DIR"""
+            """Resolve file path relative to BASE_DIR (absolute paths are kept as-is)"""
             if not path:
                 return None
             
-            # Try the path as-is first
-            if os.path.isabs(path) and os.path.exists(path):
-                return path
-            
-            # Try relative to BASE_DIR
-            base_path = os.path.join(BASE_DIR, path)
-            if os.path.exists(base_path):
-                return base_path
+            abs_path = os.path.join(BASE_DIR, path)
+            if os.path.isfile(abs_path):
+                return abs_path
             
-            # Try without 'backend/' prefix if present
-            if path.startswith('backend/'):
-                alt_path = os.path.join(BASE_DIR, path[8:])
-                if os.path.exists(alt_path):
-                    return alt_path
-            
-            logger.warning(f"File not found at path: {path} (tried: {path}, {base_path})")
+            logger.warning("File not found at path: %s (resolved to: %s)", path, abs_path)
             return None
         
         # Resolve resume path
@@ -434,14 +599,14 @@ async def send_application_email(request: EmailRequest):
             resume_abs_path = resolve_path(request.resume_path)
             if resume_abs_path:
                 attachments.append(resume_abs_path)
-                logger.info(f"Resume attachment found: {resume_abs_path}")
+                logger.info("Resume attachment found: %s", resume_abs_path)
         
         # Resolve cover letter path
         if request.cover_letter_path:
             cover_abs_path = resolve_path(request.cover_letter_path)
             if cover_abs_path:
                 attachments.append(cover_abs_path)
-                logger.info(f"Cover letter attachment found: {cover_abs_path}")
+                logger.info("Cover letter attachment found: %s", cover_abs_path)
         
         if not attachments:
             raise HTTPException(
@@ -450,7 +615,7 @@ async def send_application_email(request: EmailRequest):
             )
         
         # Send email
-        logger.info(f"Sending application email to {request.recipient_email}")
+        logger.info("Sending application email to %s", request.recipient_email)
         success = await email_service.send_application_email(
             recipient_email=request.recipient_email,
             subject=request.subject,
@@ -479,10 +644,14 @@ def get_agent():
     """Get or create agent service"""
     global career_agent
     if career_agent is None and GEMINI_API_KEY:
+        # Imported here so LangChain is only loaded once the agent is needed
+        from services.agent_service import CareerAgentService
         career_agent = CareerAgentService(
             api_key=GEMINI_API_KEY,
             document_generator=document_generator,
-            output_dir=os.path.join(BASE_DIR, "generated")
+            output_dir=os.path.join(BASE_DIR, "generated"),
+            email_service=get_email_service(),
+            gemini_service=gemini_service
         )
     return career_agent
 
@@ -510,7 +679,7 @@ async def run_agent(request: AgentRequest):
                 detail="Agent not configured. Please set GEMINI_API_KEY"
             )
         
-        logger.info(f"Running agent with task: {request.task}")
+        logger.info("Running agent with task: %s", request.task)
         
         # Run agent
         result = await agent.run(request.task)
@@ -527,19 +696,187 @@ async def run_agent(request: AgentRequest):
         logger.error(f"Error running agent: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Agent execution error: {str(e)}")
 
+@app.post("/api/agent/run-batch", response_model=List[AgentResponse])
+async def run_agent_batch(request: AgentBatchRequest):
+    """
+    Run the Career Assistant Agent on several tasks concurrently
+    
+    Args:
+        request: Batch request with task descriptions and a concurrency limit
+        
+    Returns:
+        Agent responses, in the same order as the tasks
+    """
+    try:
+        agent = get_agent()
+        if not agent:
+            raise HTTPException(
+                status_code=500,
+                detail="Agent not configured. Please set GEMINI_API_KEY"
+            )
+        
+        logger.info("Running agent on %d tasks", len(request.tasks))
+        
+        # Run agent
+        results = await agent.run_batch_async(request.tasks, max_concurrency=request.max_concurrency)
+        
+        return [
+            AgentResponse(
+                success=result.get("success", False),
+                output=result.get("output", ""),
+                intermediate_steps=result.get("intermediate_steps"),
+                action_history=result.get("action_history"),
+                error=result.get("error")
+            )
+            for result in results
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running agent batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Agent execution error: {str(e)}")
+
+@app.post("/api/agent/stream")
+async def stream_agent(request: AgentRequest):
+    """
+    Run the Career Assistant Agent and stream its progress
+    
+    Each tool call, tool result and the final answer is sent as one JSON
+    object per line (NDJSON) as soon as the agent produces it.
+    
+    Args:
+        request: Agent request with task description
+        
+    Returns:
+        Streaming NDJSON response of agent events
+    """
+    agent = get_agent()
+    if not agent:
+        raise HTTPException(
+            status_code=500,
+            detail="Agent not configured. Please set GEMINI_API_KEY"
+        )
+    
+    logger.info("Streaming agent with task: %s", request.task)
+    
+    async def event_lines():
+        async for event in agent.stream_run(request.task):
+            # Steps were already streamed one by one as action/observation events
+            event.pop("intermediate_steps", None)
+            yield orjson.dumps(event, default=str) + b"\n"
+    
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+def resolve_upload_path(path: str) -> str:
+    """
+    Resolve a path relative to BASE_DIR, rejecting anything outside UPLOAD_DIR
+    
+    Args:
+        path: Path from the request
+        
+    Returns:
+        Canonical absolute path
+    """
+    abs_path = os.path.realpath(os.path.join(BASE_DIR, path))
+    if os.path.commonpath([abs_path, UPLOAD_DIR]) != UPLOAD_DIR:
+        raise HTTPException(status_code=400, detail=f"Path must be inside the uploads directory: {path}")
+    return abs_path
+
+@app.post("/api/agent/run-plan", response_model=AgentResponse)
+async def run_agent_plan(request: AgentPlanRequest):
+    """
+    Run the full application workflow with independent steps in parallel
+    
+    Parses, analyzes and generates documents for a resume and job description
+    without an LLM planning loop, running independent tool calls concurrently.
+    
+    Pass the analysis_id returned by /api/upload-and-analyze to reuse the text
+    extracted from those uploads. Alternatively pass resume_path and job_path;
+    uploads are not stored on disk, so these files must be placed in
+    backend/uploads out of band.
+    
+    Args:
+        request: Plan request with an analysis ID or document paths, output format
+            and optional recipient
+        
+    Returns:
+        Agent response with output and action history
+    """
+    try:
+        agent = get_agent()
+        if not agent:
+            raise HTTPException(
+                status_code=500,
+                detail="Agent not configured. Please set GEMINI_API_KEY"
+            )
+        
+        if request.format not in ["docx", "pdf"]:
+            raise HTTPException(status_code=400, detail="Format must be 'docx' or 'pdf'")
+        
+        resume_path = job_path = resume_text = job_text = None
+        if request.analysis_id:
+            entry = await get_analysis(request.analysis_id)
+            if entry is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Analysis not found or expired. Please upload the files again"
+                )
+            resume_text, job_text = entry["resume_text"], entry["job_text"]
+        elif request.resume_path and request.job_path:
+            # Only documents inside the uploads directory may be read
+            resume_path = resolve_upload_path(request.resume_path)
+            job_path = resolve_upload_path(request.job_path)
+        else:
+            raise HTTPException(status_code=400, detail="Provide analysis_id, or both resume_path and job_path")
+        
+        # Generated documents are emailed, so check the recipient before doing any work
+        if request.recipient_email is not None:
+            from services.email_service import EmailService
+            if not EmailService.validate_email(request.recipient_email):
+                raise HTTPException(status_code=400, detail="Invalid recipient email address")
+        
+        logger.info("Running agent plan for %s", request.analysis_id or f"{resume_path} and {job_path}")
+        
+        # Run plan
+        result = await agent.run_plan(
+            resume_path,
+            job_path,
+            format_type=request.format,
+            recipient_email=request.recipient_email,
+            resume_text=resume_text,
+            job_text=job_text
+        )
+        
+        return AgentResponse(
+            success=result.get("success", False),
+            output=result.get("output", ""),
+            action_history=result.get("action_history"),
+            error=result.get("error")
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running agent plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Agent execution error: {str(e)}")
+
 @app.get("/api/agent/metrics")
-async def get_agent_metrics():
+async def get_agent_metrics(include_history: bool = False):
     """
     Get agent performance metrics
     
     Returns agent performance statistics for evaluation purposes
+    
+    Args:
+        include_history: Also return the full action history of the latest run
     """
     try:
         agent = get_agent()
         if not agent:
             return {"message": "Agent not initialized yet"}
         
-        metrics = agent.get_metrics()
+        metrics = agent.get_metrics(include_history=include_history)
         return metrics
         
     except Exception as e:
@@ -574,13 +911,14 @@ async def evaluate_agent(request: EvaluationRequest):
         logger.info("Starting agent evaluation...")
         
         # Create evaluator
+        from services.agent_evaluator import AgentEvaluator, generate_benchmark_report
         evaluator = AgentEvaluator(agent)
         
         # Run evaluation
         report = await evaluator.evaluate_all(output_dir=request.output_dir)
         
         # Generate benchmark comparison
-        benchmark = BenchmarkComparison.generate_benchmark_report(report)
+        benchmark = generate_benchmark_report(report)
         
         # Prepare summary
         summary = {
@@ -595,7 +933,7 @@ async def evaluate_agent(request: EvaluationRequest):
         }
         
         # Save path
-        report_filename = f"evaluation_report_{report.timestamp.replace(':', '-').split('.')[0]}.json"
+        report_filename = f"evaluation_report_{datetime.fromisoformat(report.timestamp).strftime('%Y%m%d_%H%M%S')}.json"
         report_path = os.path.join(request.output_dir, report_filename) if request.save_results else None
         
         return EvaluationResponse(
@@ -635,7 +973,7 @@ async def list_agent_tools():
             "total_tools": len(tools_info),
             "tools": tools_info,
             "framework": "LangChain with Google Gemini",
-            "agent_type": "ReAct (Reasoning + Acting)"
+            "agent_type": "Structured Chat (JSON tool calls)"
         }
         
     except Exception as e:
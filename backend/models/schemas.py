@@ -30,6 +30,7 @@ class AnalysisResult(BaseModel):
     resume_analysis: ResumeAnalysis
     skill_gap: SkillGap
     match_percentage: float
+    analysis_id: Optional[str] = None
 
 class GeneratedDocument(BaseModel):
     """Model for generated documents"""
@@ -62,6 +63,19 @@ class AgentRequest(BaseModel):
     task: str
     context: Optional[Dict[str, Any]] = None
 
+class AgentBatchRequest(BaseModel):
+    """Request model for running several agent tasks at once"""
+    tasks: List[str]
+    max_concurrency: int = 8
+
+class AgentPlanRequest(BaseModel):
+    """Request model for running the full application workflow"""
+    analysis_id: Optional[str] = None
+    resume_path: Optional[str] = None
+    job_path: Optional[str] = None
+    format: str = "pdf"
+    recipient_email: Optional[str] = None
+
 class AgentResponse(BaseModel):
     """Response from agent execution"""
     success: bool
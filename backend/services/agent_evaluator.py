@@ -5,17 +5,25 @@ This module provides evaluation capabilities for the Career Assistant Agent,
 satisfying Track A requirements for agent evaluation.
 """
 
-from typing import Dict, Any, List, Optional
-import json
+from typing import Dict, Any, FrozenSet, List, Optional, Set, Tuple
+import asyncio
 import logging
+import statistics
+import sys
+import time
+import orjson
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 import os
 
 logger = logging.getLogger(__name__)
 
+# Horizontal rules for the console summary
+_RULE = "=" * 70
+_RULE_NL = _RULE + "\n"
 
-@dataclass
+
+@dataclass(slots=True)
 class EvaluationResult:
     """Result of a single agent evaluation test"""
     test_name: str
@@ -29,10 +37,20 @@ class EvaluationResult:
     agent_output: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            "test_name": self.test_name,
+            "task_description": self.task_description,
+            "success": self.success,
+            "expected_tools": self.expected_tools,
+            "tools_used": self.tools_used,
+            "execution_time": self.execution_time,
+            "num_steps": self.num_steps,
+            "error_message": self.error_message,
+            "agent_output": self.agent_output
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class EvaluationReport:
     """Complete evaluation report"""
     timestamp: str
@@ -44,18 +62,110 @@ class EvaluationReport:
     average_execution_time: float
     test_results: List[EvaluationResult]
     agent_metrics: Dict[str, Any]
+    # Benchmark report computed on first request; orjson skips underscore fields
+    _cached_benchmark: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
-            **asdict(self),
-            "test_results": [tr.to_dict() for tr in self.test_results]
+            "timestamp": self.timestamp,
+            "total_tests": self.total_tests,
+            "passed_tests": self.passed_tests,
+            "failed_tests": self.failed_tests,
+            "success_rate": self.success_rate,
+            "average_steps": self.average_steps,
+            "average_execution_time": self.average_execution_time,
+            "test_results": [tr.to_dict() for tr in self.test_results],
+            "agent_metrics": self.agent_metrics
         }
     
     def save_to_file(self, filepath: str):
         """Save evaluation report to JSON file"""
-        with open(filepath, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
-        logger.info(f"Evaluation report saved to {filepath}")
+        # orjson serializes the dataclasses natively, without an intermediate dict
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(self, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        logger.info("Evaluation report saved to %s", filepath)
+
+
+@dataclass(slots=True)
+class CriterionContext:
+    """Facts about an agent run, computed once and shared by success criteria"""
+    tools: Set[str]
+    expected_tools: FrozenSet[str]
+    output_lower: str
+    num_steps: int
+    success: bool
+
+
+# Test cases for agent evaluation, built once at import time and shared by all
+# evaluators. These validate the agent's ability to:
+# 1. Parse and understand documents
+# 2. Perform skill analysis
+# 3. Generate documents
+# 4. Use tools appropriately
+# 5. Handle errors gracefully
+_TEST_CASES: Tuple[Dict[str, Any], ...] = tuple(
+    # Precompute each case's expected tools as a frozenset for membership checks
+    {**test_case, "expected_tools_set": frozenset(test_case["expected_tools"])}
+    for test_case in (
+        {
+            "name": "parse_resume_test",
+            "task": "Parse the resume PDF located at uploads/test_resume.pdf",
+            "expected_tools": ["parse_pdf"],
+            "success_criteria": lambda result, ctx: ctx.expected_tools <= ctx.tools,
+            "timeout": 30
+        },
+        {
+            "name": "analyze_job_test",
+            "task": "Analyze the job description PDF at uploads/test_job.pdf and tell me the required skills",
+            "expected_tools": ["parse_pdf", "analyze_job_description"],
+            "success_criteria": lambda result, ctx: "required_skills" in ctx.output_lower or "skills" in ctx.output_lower,
+            "timeout": 60
+        },
+        {
+            "name": "skill_gap_analysis_test",
+            "task": "Compare my resume at uploads/test_resume.pdf with the job at uploads/test_job.pdf and identify skill gaps",
+            "expected_tools": ["parse_pdf", "analyze_job_description", "analyze_resume", "analyze_skill_gap"],
+            "success_criteria": lambda result, ctx: "analyze_skill_gap" in ctx.tools,
+            "timeout": 90
+        },
+        {
+            "name": "document_generation_test",
+            "task": "Generate a tailored resume in PDF format using my resume at uploads/test_resume.pdf for the job at uploads/test_job.pdf",
+            "expected_tools": ["parse_pdf", "generate_tailored_resume"],
+            "success_criteria": lambda result, ctx: "generate_tailored_resume" in ctx.tools,
+            "timeout": 120
+        },
+        {
+            "name": "full_workflow_test",
+            "task": "I want to apply for a job. Parse my resume and the job description, analyze skill gaps, and generate both a tailored resume and cover letter in PDF format",
+            # The agent is prompted to generate both documents with one package call
+            "expected_tools": ["parse_pdf", "analyze_job_description", "analyze_resume", "analyze_skill_gap", "generate_application_package"],
+            "success_criteria": lambda result, ctx: ctx.num_steps >= 5,
+            "timeout": 180
+        },
+        {
+            "name": "document_validation_test",
+            "task": "Validate that the resume and cover letter documents exist at generated/test_resume.pdf and generated/test_cover_letter.pdf",
+            "expected_tools": ["validate_documents"],
+            "success_criteria": lambda result, ctx: ctx.expected_tools <= ctx.tools,
+            "timeout": 30
+        },
+        {
+            "name": "tool_selection_test",
+            "task": "What are the key skills mentioned in the job description at uploads/test_job.pdf?",
+            "expected_tools": ["parse_pdf", "analyze_job_description"],
+            "success_criteria": lambda result, ctx: ctx.success and ctx.num_steps <= 3,
+            "timeout": 60
+        },
+        {
+            "name": "error_handling_test",
+            "task": "Parse the resume at invalid/nonexistent_file.pdf",
+            "expected_tools": ["parse_pdf"],
+            "success_criteria": lambda result, ctx: "error" in ctx.output_lower or not ctx.success,
+            "timeout": 30
+        }
+    )
+)
 
 
 class AgentEvaluator:
@@ -74,77 +184,7 @@ class AgentEvaluator:
             agent_service: Instance of CareerAgentService to evaluate
         """
         self.agent = agent_service
-        self.test_cases = self._define_test_cases()
-    
-    def _define_test_cases(self) -> List[Dict[str, Any]]:
-        """
-        Define test cases for agent evaluation
-        
-        These test cases validate the agent's ability to:
-        1. Parse and understand documents
-        2. Perform skill analysis
-        3. Generate documents
-        4. Use tools appropriately
-        5. Handle errors gracefully
-        """
-        return [
-            {
-                "name": "parse_resume_test",
-                "task": "Parse the resume PDF located at uploads/test_resume.pdf",
-                "expected_tools": ["parse_pdf"],
-                "success_criteria": lambda result: "parse_pdf" in str(result.get("action_history", [])),
-                "timeout": 30
-            },
-            {
-                "name": "analyze_job_test",
-                "task": "Analyze the job description PDF at uploads/test_job.pdf and tell me the required skills",
-                "expected_tools": ["parse_pdf", "analyze_job_description"],
-                "success_criteria": lambda result: "required_skills" in result.get("output", "").lower() or "skills" in result.get("output", "").lower(),
-                "timeout": 60
-            },
-            {
-                "name": "skill_gap_analysis_test",
-                "task": "Compare my resume at uploads/test_resume.pdf with the job at uploads/test_job.pdf and identify skill gaps",
-                "expected_tools": ["parse_pdf", "analyze_job_description", "analyze_resume", "analyze_skill_gap"],
-                "success_criteria": lambda result: any(tool in str(result.get("action_history", [])) for tool in ["analyze_skill_gap", "skill"]),
-                "timeout": 90
-            },
-            {
-                "name": "document_generation_test",
-                "task": "Generate a tailored resume in PDF format using my resume at uploads/test_resume.pdf for the job at uploads/test_job.pdf",
-                "expected_tools": ["parse_pdf", "generate_tailored_resume"],
-                "success_criteria": lambda result: "generate" in str(result.get("action_history", [])).lower() and "resume" in str(result.get("action_history", [])).lower(),
-                "timeout": 120
-            },
-            {
-                "name": "full_workflow_test",
-                "task": "I want to apply for a job. Parse my resume and the job description, analyze skill gaps, and generate both a tailored resume and cover letter in PDF format",
-                "expected_tools": ["parse_pdf", "analyze_job_description", "analyze_resume", "analyze_skill_gap", "generate_tailored_resume", "generate_cover_letter"],
-                "success_criteria": lambda result: len(result.get("action_history", [])) >= 5,
-                "timeout": 180
-            },
-            {
-                "name": "document_validation_test",
-                "task": "Validate that the resume and cover letter documents exist at generated/test_resume.pdf and generated/test_cover_letter.pdf",
-                "expected_tools": ["validate_documents"],
-                "success_criteria": lambda result: "validate" in str(result.get("action_history", [])).lower(),
-                "timeout": 30
-            },
-            {
-                "name": "tool_selection_test",
-                "task": "What are the key skills mentioned in the job description at uploads/test_job.pdf?",
-                "expected_tools": ["parse_pdf", "analyze_job_description"],
-                "success_criteria": lambda result: result.get("success", False) and len(result.get("action_history", [])) <= 3,
-                "timeout": 60
-            },
-            {
-                "name": "error_handling_test",
-                "task": "Parse the resume at invalid/nonexistent_file.pdf",
-                "expected_tools": ["parse_pdf"],
-                "success_criteria": lambda result: "error" in result.get("output", "").lower() or not result.get("success", True),
-                "timeout": 30
-            }
-        ]
+        self.test_cases = _TEST_CASES
     
     async def evaluate_single_test(self, test_case: Dict[str, Any]) -> EvaluationResult:
         """
@@ -156,26 +196,34 @@ class AgentEvaluator:
         Returns:
             EvaluationResult with test outcome
         """
-        import time
+        logger.info("Running test: %s", test_case['name'])
         
-        logger.info(f"Running test: {test_case['name']}")
-        
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            # Run agent with test task
-            result = await self.agent.run(test_case["task"])
+            # Run agent with test task, bounded by the test's timeout; never from
+            # the run cache, so timings reflect real runs
+            result = await asyncio.wait_for(
+                self.agent.run(test_case["task"], use_cache=False),
+                timeout=test_case["timeout"]
+            )
             
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
             # Extract tools used from action history
-            tools_used = [
-                action["action"] 
-                for action in result.get("action_history", [])
-            ]
+            action_history = result.get("action_history") or []
+            tools_used = [action["action"] for action in action_history]
+            num_steps = len(action_history)
             
-            # Check success criteria
-            success = test_case["success_criteria"](result)
+            # Check success criteria against facts derived once from the run
+            ctx = CriterionContext(
+                tools=set(tools_used),
+                expected_tools=test_case["expected_tools_set"],
+                output_lower=result.get("output", "").lower(),
+                num_steps=num_steps,
+                success=result.get("success", False)
+            )
+            success = test_case["success_criteria"](result, ctx)
             
             # Create evaluation result
             eval_result = EvaluationResult(
@@ -185,17 +233,32 @@ class AgentEvaluator:
                 expected_tools=test_case["expected_tools"],
                 tools_used=tools_used,
                 execution_time=execution_time,
-                num_steps=len(result.get("action_history", [])),
+                num_steps=num_steps,
                 agent_output=result.get("output", ""),
                 error_message=result.get("error") if not success else None
             )
             
-            logger.info(f"Test {test_case['name']}: {'PASSED' if success else 'FAILED'}")
+            logger.info("Test %s: %s", test_case['name'], 'PASSED' if success else 'FAILED')
             
             return eval_result
             
+        except asyncio.TimeoutError:
+            execution_time = time.perf_counter() - start_time
+            logger.error(f"Test {test_case['name']} timed out after {test_case['timeout']}s")
+            
+            return EvaluationResult(
+                test_name=test_case["name"],
+                task_description=test_case["task"],
+                success=False,
+                expected_tools=test_case["expected_tools"],
+                tools_used=[],
+                execution_time=execution_time,
+                num_steps=0,
+                error_message=f"timed out after {test_case['timeout']}s"
+            )
+            
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             logger.error(f"Test {test_case['name']} failed with exception: {str(e)}")
             
             return EvaluationResult(
@@ -223,26 +286,44 @@ class AgentEvaluator:
         
         os.makedirs(output_dir, exist_ok=True)
         
-        results: List[EvaluationResult] = []
+        # Read the clock once so the report timestamp and filenames agree
+        now = datetime.now()
+        file_stamp = now.strftime('%Y%m%d_%H%M%S')
+        
+        # Run test cases concurrently; the agent calls are LLM-bound, so the
+        # suite takes about as long as its slowest tests rather than their sum
+        semaphore = asyncio.Semaphore(int(os.getenv("EVAL_CONCURRENCY", "4")))
         
-        # Run all test cases
-        for test_case in self.test_cases:
-            result = await self.evaluate_single_test(test_case)
-            results.append(result)
+        # Each result is appended to a JSONL file as soon as its test finishes,
+        # so a crash mid-suite keeps the results gathered so far
+        results_path = os.path.join(output_dir, f"eval_{file_stamp}.jsonl")
+        with open(results_path, 'wb') as results_file:
+            
+            async def run_test(test_case: Dict[str, Any]) -> EvaluationResult:
+                async with semaphore:
+                    result = await self.evaluate_single_test(test_case)
+                results_file.write(orjson.dumps(result) + b"\n")
+                results_file.flush()
+                return result
+            
+            # gather keeps results in test case order
+            results: List[EvaluationResult] = await asyncio.gather(
+                *[run_test(test_case) for test_case in self.test_cases]
+            )
         
         # Calculate metrics
-        passed = sum(1 for r in results if r.success)
+        passed = sum(r.success for r in results)
         failed = len(results) - passed
         success_rate = (passed / len(results) * 100) if results else 0
         avg_steps = sum(r.num_steps for r in results) / len(results) if results else 0
-        avg_time = sum(r.execution_time for r in results) / len(results) if results else 0
+        avg_time = statistics.fmean(r.execution_time for r in results) if results else 0
         
         # Get agent-specific metrics
         agent_metrics = self.agent.get_metrics()
         
         # Create report
         report = EvaluationReport(
-            timestamp=datetime.now().isoformat(),
+            timestamp=now.isoformat(),
             total_tests=len(results),
             passed_tests=passed,
             failed_tests=failed,
@@ -254,7 +335,7 @@ class AgentEvaluator:
         )
         
         # Save report
-        report_path = os.path.join(output_dir, f"evaluation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        report_path = os.path.join(output_dir, f"evaluation_report_{file_stamp}.json")
         report.save_to_file(report_path)
         
         # Print summary
@@ -264,106 +345,124 @@ class AgentEvaluator:
     
     def _print_summary(self, report: EvaluationReport):
         """Print evaluation summary to console"""
-        print("\n" + "="*70)
-        print("AGENT EVALUATION SUMMARY")
-        print("="*70)
-        print(f"Timestamp: {report.timestamp}")
-        print(f"Total Tests: {report.total_tests}")
-        print(f"Passed: {report.passed_tests} ✓")
-        print(f"Failed: {report.failed_tests} ✗")
-        print(f"Success Rate: {report.success_rate:.1f}%")
-        print(f"Average Steps per Task: {report.average_steps:.1f}")
-        print(f"Average Execution Time: {report.average_execution_time:.2f}s")
-        print("="*70)
+        # Collect the lines and write them in one go
+        lines: List[str] = []
+        
+        lines.append("\n" + _RULE)
+        lines.append("AGENT EVALUATION SUMMARY")
+        lines.append(_RULE)
+        lines.append(f"Timestamp: {report.timestamp}")
+        lines.append(f"Total Tests: {report.total_tests}")
+        lines.append(f"Passed: {report.passed_tests} ✓")
+        lines.append(f"Failed: {report.failed_tests} ✗")
+        lines.append(f"Success Rate: {report.success_rate:.1f}%")
+        lines.append(f"Average Steps per Task: {report.average_steps:.1f}")
+        lines.append(f"Average Execution Time: {report.average_execution_time:.2f}s")
+        lines.append(_RULE)
         
-        print("\nTest Results:")
+        lines.append("\nTest Results:")
         for result in report.test_results:
             status = "✓ PASS" if result.success else "✗ FAIL"
-            print(f"  {status} - {result.test_name}")
-            print(f"    Tools Used: {', '.join(result.tools_used) if result.tools_used else 'None'}")
-            print(f"    Time: {result.execution_time:.2f}s, Steps: {result.num_steps}")
+            lines.append(f"  {status} - {result.test_name}")
+            lines.append(f"    Tools Used: {', '.join(result.tools_used) if result.tools_used else 'None'}")
+            lines.append(f"    Time: {result.execution_time:.2f}s, Steps: {result.num_steps}")
             if not result.success and result.error_message:
-                print(f"    Error: {result.error_message}")
+                lines.append(f"    Error: {result.error_message}")
         
-        print("\n" + "="*70)
-        print(f"Agent Performance Metrics:")
-        print(f"  Total Actions: {report.agent_metrics.get('total_actions', 0)}")
-        print(f"  Successful Actions: {report.agent_metrics.get('successful_actions', 0)}")
-        print(f"  Action Success Rate: {report.agent_metrics.get('success_rate', 0):.1f}%")
+        lines.append("\n" + _RULE)
+        lines.append(f"Agent Performance Metrics:")
+        lines.append(f"  Total Actions: {report.agent_metrics.get('total_actions', 0)}")
+        lines.append(f"  Successful Actions: {report.agent_metrics.get('successful_actions', 0)}")
+        lines.append(f"  Action Success Rate: {report.agent_metrics.get('success_rate', 0):.1f}%")
         
         if 'action_breakdown' in report.agent_metrics:
-            print(f"\n  Action Breakdown:")
+            lines.append(f"\n  Action Breakdown:")
             for action, count in report.agent_metrics['action_breakdown'].items():
-                print(f"    - {action}: {count}")
+                lines.append(f"    - {action}: {count}")
         
-        print("="*70 + "\n")
+        lines.append(_RULE_NL)
+        
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
-class BenchmarkComparison:
+# Benchmark metrics comparing agent performance against baselines.
+# These provide standardized metrics similar to AgentEval and HumanEval.
+
+def calculate_task_success_rate(report: EvaluationReport) -> float:
+    """Calculate task completion success rate"""
+    return report.success_rate
+
+
+def calculate_tool_efficiency(report: EvaluationReport) -> float:
     """
-    Compare agent performance against benchmarks
+    Calculate tool usage efficiency
     
-    This provides standardized metrics similar to AgentEval and HumanEval
+    Measures how efficiently the agent uses tools compared to expected
     """
+    total = 0.0
+    count = 0
     
-    @staticmethod
-    def calculate_task_success_rate(report: EvaluationReport) -> float:
-        """Calculate task completion success rate"""
-        return report.success_rate
-    
-    @staticmethod
-    def calculate_tool_efficiency(report: EvaluationReport) -> float:
-        """
-        Calculate tool usage efficiency
-        
-        Measures how efficiently the agent uses tools compared to expected
-        """
-        efficiency_scores = []
-        
-        for result in report.test_results:
-            expected_count = len(result.expected_tools)
-            actual_count = len(result.tools_used)
-            
-            if expected_count > 0:
-                # Score is higher when actual is close to expected
-                efficiency = 1.0 - abs(actual_count - expected_count) / expected_count
-                efficiency_scores.append(max(0, efficiency))
+    for result in report.test_results:
+        expected_count = len(result.expected_tools)
         
-        return sum(efficiency_scores) / len(efficiency_scores) if efficiency_scores else 0
+        if expected_count > 0:
+            # Score is higher when actual is close to expected
+            efficiency = 1.0 - abs(len(result.tools_used) - expected_count) / expected_count
+            total += max(0.0, efficiency)
+            count += 1
     
-    @staticmethod
-    def generate_benchmark_report(report: EvaluationReport) -> Dict[str, Any]:
-        """
-        Generate standardized benchmark report
-        
-        Returns:
-            Dictionary with benchmark metrics
-        """
-        return {
-            "benchmark_name": "Career Assistant Agent Evaluation",
-            "version": "1.0",
-            "timestamp": report.timestamp,
-            "metrics": {
-                "task_success_rate": BenchmarkComparison.calculate_task_success_rate(report),
-                "tool_efficiency": BenchmarkComparison.calculate_tool_efficiency(report),
-                "average_execution_time": report.average_execution_time,
-                "average_reasoning_steps": report.average_steps,
-                "error_recovery_rate": report.agent_metrics.get("success_rate", 0) / 100
-            },
-            "test_coverage": {
-                "total_tests": report.total_tests,
-                "test_categories": [
-                    "document_parsing",
-                    "skill_analysis",
-                    "document_generation",
-                    "tool_orchestration",
-                    "error_handling"
-                ]
-            },
-            "comparison_to_baseline": {
-                "status": "Track A Compliant",
-                "framework": "LangChain with Google Gemini",
-                "tool_integration": "✓ Implemented",
-                "evaluation_framework": "✓ Implemented"
-            }
+    return total / count if count else 0
+
+
+def generate_benchmark_report(report: EvaluationReport) -> Dict[str, Any]:
+    """
+    Generate standardized benchmark report
+    
+    The result is cached on the report, so later consumers get it for free.
+    
+    Returns:
+        Dictionary with benchmark metrics
+    """
+    if report._cached_benchmark is None:
+        report._cached_benchmark = _build_benchmark_report(report)
+    return report._cached_benchmark
+
+
+def _build_benchmark_report(report: EvaluationReport) -> Dict[str, Any]:
+    """Compute the benchmark report for generate_benchmark_report"""
+    return {
+        "benchmark_name": "Career Assistant Agent Evaluation",
+        "version": "1.0",
+        "timestamp": report.timestamp,
+        "metrics": {
+            "task_success_rate": calculate_task_success_rate(report),
+            "tool_efficiency": calculate_tool_efficiency(report),
+            "average_execution_time": report.average_execution_time,
+            "average_reasoning_steps": report.average_steps,
+            "error_recovery_rate": report.agent_metrics.get("success_rate", 0) / 100
+        },
+        "test_coverage": {
+            "total_tests": report.total_tests,
+            "test_categories": [
+                "document_parsing",
+                "skill_analysis",
+                "document_generation",
+                "tool_orchestration",
+                "error_handling"
+            ]
+        },
+        "comparison_to_baseline": {
+            "status": "Track A Compliant",
+            "framework": "LangChain with Google Gemini",
+            "tool_integration": "✓ Implemented",
+            "evaluation_framework": "✓ Implemented"
         }
+    }
+
+
+class BenchmarkComparison:
+    """Backwards-compatible namespace for the benchmark functions above"""
+    
+    calculate_task_success_rate = staticmethod(calculate_task_success_rate)
+    calculate_tool_efficiency = staticmethod(calculate_tool_efficiency)
+    generate_benchmark_report = staticmethod(generate_benchmark_report)
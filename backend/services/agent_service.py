@@ -5,14 +5,26 @@ This module implements a Track A compliant agent system that uses LangChain
 tools to perform real actions for job application assistance.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Any, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
 import logging
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.tools import Tool
+import re
+from collections import Counter, deque
+from contextvars import ContextVar
+from langchain.agents import AgentExecutor, create_structured_chat_agent
+from langchain.tools import StructuredTool
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain.schema import AgentAction, AgentFinish
-import json
+from cachetools import TTLCache
+import orjson
+import os
+import time
+from itertools import islice
+from weakref import WeakValueDictionary
+from datetime import datetime
 
 from services.pdf_parser import PDFParser
 from services.skill_analyzer import SkillAnalyzer
@@ -22,6 +34,102 @@ from services.gemini_service import GeminiService
 
 logger = logging.getLogger(__name__)
 
+# Action history of the run executing in the current context, so that
+# concurrent runs on one agent each record only their own actions
+_run_history: ContextVar[Optional[Deque[Dict[str, Any]]]] = ContextVar("run_history", default=None)
+
+# Most actions kept per history, so a long-lived service has a fixed memory ceiling
+MAX_ACTION_HISTORY = 10_000
+
+
+# File paths mentioned in a request, whose contents make part of the run cache key
+_PDF_PATH_PATTERN = re.compile(r"[\w./\\~-]+\.pdf", re.IGNORECASE)
+
+# Requests that may send email have side effects and are never served from cache;
+# word stems, so "emails", "emailing", "sending" and "mail the resume" match too
+_EMAIL_INTENT_PATTERN = re.compile(r"\b(?:e-?mail|mail|send)", re.IGNORECASE)
+
+# Seconds a generated document is reused for identical inputs, matching the Gemini cache TTL
+DOCUMENT_REUSE_TTL = 3600
+
+
+class ParsePdfInput(BaseModel):
+    """Arguments of the parse_pdf tool"""
+    file_path: str = Field(description="Path to the PDF file")
+
+
+class AnalyzeJobInput(BaseModel):
+    """Arguments of the analyze_job_description tool"""
+    job_text: str = Field(description="Job description text")
+
+
+class AnalyzeJobsBatchInput(BaseModel):
+    """Arguments of the analyze_job_descriptions_batch tool"""
+    texts: List[str] = Field(description="Job description texts")
+    batch_size: int = Field(default=3, description="Job descriptions sent per Gemini call")
+
+
+class AnalyzeResumeInput(BaseModel):
+    """Arguments of the analyze_resume tool"""
+    resume_text: str = Field(description="Resume text")
+
+
+class SkillGapInput(BaseModel):
+    """Arguments of the analyze_skill_gap tool"""
+    job_skills: List[str] = Field(description="Skills required or preferred by the job")
+    candidate_skills: List[str] = Field(description="Skills listed on the resume")
+
+
+class GenerateDocumentInput(BaseModel):
+    """Arguments of the document generation tools"""
+    resume_text: str = Field(description="Original resume text")
+    job_text: str = Field(description="Job description text")
+    format: str = Field(default="pdf", description="Output format, pdf or docx")
+
+
+class SendEmailInput(BaseModel):
+    """Arguments of the send_application_email tool"""
+    recipient_email: str = Field(description="Email address to send the application to")
+    subject: str = Field(description="Email subject")
+    body: str = Field(description="Email body")
+    resume_path: Optional[str] = Field(default=None, description="Path to the generated resume")
+    cover_letter_path: Optional[str] = Field(default=None, description="Path to the generated cover letter")
+    candidate_name: Optional[str] = Field(default=None, description="Candidate name for the email signature")
+
+
+class ValidateDocumentsInput(BaseModel):
+    """Arguments of the validate_documents tool"""
+    resume_path: Optional[str] = Field(default=None, description="Path to the generated resume")
+    cover_letter_path: Optional[str] = Field(default=None, description="Path to the generated cover letter")
+
+
+def _loads(data: str) -> Any:
+    """Parse a JSON tool input"""
+    return orjson.loads(data)
+
+
+def _dumps(obj: Any) -> str:
+    """
+    Serialize a tool result as compact JSON text for the LLM
+    
+    Tool output is pasted into the scratchpad of every later agent step, so
+    indentation would only add prompt tokens.
+    """
+    return orjson.dumps(obj).decode()
+
+
+def _export_history(history: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return action history entries with their raw ``ts_ns`` formatted as an ISO timestamp"""
+    return [
+        {
+            "action": entry["action"],
+            "inputs": entry["inputs"],
+            "outputs": entry["outputs"],
+            "timestamp": datetime.fromtimestamp(entry["ts_ns"] / 1e9).isoformat()
+        }
+        for entry in history
+    ]
+
 
 class CareerAgentService:
     """
@@ -35,7 +143,9 @@ class CareerAgentService:
         self,
         api_key: str,
         document_generator: DocumentGenerator,
-        output_dir: str = "generated"
+        output_dir: str = "generated",
+        email_service: Optional[EmailService] = None,
+        gemini_service: Optional[GeminiService] = None
     ):
         """
         Initialize the Career Agent with LangChain tools
@@ -44,14 +154,38 @@ class CareerAgentService:
             api_key: Google Gemini API key
             document_generator: Document generator instance
             output_dir: Directory for generated files
+            email_service: Shared email service; built from the SMTP environment
+                variables when omitted
+            gemini_service: Shared Gemini service, so the agent reuses the API's
+                client and cached results; a private one is created when omitted
         """
         self.api_key = api_key
         self.pdf_parser = PDFParser()
         self.skill_analyzer = SkillAnalyzer()
         self.document_generator = document_generator
-        self.gemini_service = GeminiService(api_key)
+        if gemini_service is None:
+            # Re-runs over the same resume/job pair are common, so keep plenty
+            # of results around, expiring them after an hour
+            gemini_service = GeminiService(api_key, cache_size=512, cache_ttl=3600)
+        self.gemini_service = gemini_service
         self.output_dir = output_dir
         
+        # One lock per generated filename, so concurrent identical requests build it once
+        self._document_locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
+        
+        # One email service for every send, so its SMTP connection is reused
+        if email_service is None:
+            sender_email = os.getenv("SENDER_EMAIL")
+            sender_password = os.getenv("SENDER_PASSWORD")
+            if sender_email and sender_password:
+                email_service = EmailService(
+                    smtp_server=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+                    smtp_port=int(os.getenv("SMTP_PORT", "587")),
+                    sender_email=sender_email,
+                    sender_password=sender_password
+                )
+        self.email_service = email_service
+        
         # Initialize LangChain LLM
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-pro",
@@ -66,90 +200,122 @@ class CareerAgentService:
         # Create agent
         self.agent_executor = self._create_agent()
         
+        # Results of recent runs, keyed by the request and the files it references
+        self._run_cache: TTLCache = TTLCache(maxsize=256, ttl=600)
+        
         # Track agent actions for evaluation
-        self.action_history: List[Dict[str, Any]] = []
+        self.action_history: Deque[Dict[str, Any]] = deque(maxlen=MAX_ACTION_HISTORY)
+        self._start_history()
+        
+        # Lifetime run counters, including runs served from the run cache
+        self._total_runs = 0
+        self._cache_hits = 0
     
-    def _create_tools(self) -> List[Tool]:
+    def _create_tools(self) -> List[StructuredTool]:
         """Create LangChain tools from existing services"""
         
+        def structured(tool_fn: Callable[[str], Awaitable[str]], json_input: bool = True) -> Dict[str, Any]:
+            # Async only: the services hold loop-bound state (locks, pooled SMTP
+            # connection, in-flight Gemini futures) that a fresh loop can't use
+            return {"coroutine": self._from_args(tool_fn, json_input)}
+        
         tools = [
-            Tool(
+            StructuredTool(
                 name="parse_pdf",
-                func=self._parse_pdf_tool,
+                args_schema=ParsePdfInput,
+                **structured(self._parse_pdf_tool, json_input=False),
                 description=(
                     "Extracts text content from a PDF file. "
-                    "Input should be a file path to a PDF document. "
                     "Returns the extracted text content. "
                     "Use this when you need to read resume or job description PDFs."
                 )
             ),
-            Tool(
+            StructuredTool(
                 name="analyze_job_description",
-                func=self._analyze_job_tool,
+                args_schema=AnalyzeJobInput,
+                **structured(self._analyze_job_tool, json_input=False),
                 description=(
                     "Analyzes a job description text to extract structured information. "
-                    "Input should be the job description text. "
                     "Returns: job_title, company_name, required_skills, preferred_skills, "
                     "key_responsibilities, and contact_email. "
                     "Use this to understand job requirements."
                 )
             ),
-            Tool(
+            StructuredTool(
+                name="analyze_job_descriptions_batch",
+                args_schema=AnalyzeJobsBatchInput,
+                **structured(self._analyze_jobs_batch_tool),
+                description=(
+                    "Analyzes several job description texts at once. "
+                    "Returns a JSON array with one analysis per job description, in order. "
+                    "Use this instead of analyze_job_description when comparing multiple job postings."
+                )
+            ),
+            StructuredTool(
                 name="analyze_resume",
-                func=self._analyze_resume_tool,
+                args_schema=AnalyzeResumeInput,
+                **structured(self._analyze_resume_tool, json_input=False),
                 description=(
                     "Analyzes a resume text to extract candidate information. "
-                    "Input should be the resume text. "
                     "Returns: candidate_name, skills, experience, education, and summary. "
                     "Use this to understand candidate qualifications."
                 )
             ),
-            Tool(
+            StructuredTool(
                 name="analyze_skill_gap",
-                func=self._analyze_skill_gap_tool,
+                args_schema=SkillGapInput,
+                **structured(self._analyze_skill_gap_tool),
                 description=(
                     "Compares candidate skills against job requirements. "
-                    "Input should be JSON with 'job_skills' and 'candidate_skills' arrays. "
                     "Returns: matching_skills, missing_skills, partial_skills, and match_percentage. "
                     "Use this to identify skill gaps."
                 )
             ),
-            Tool(
+            StructuredTool(
                 name="generate_tailored_resume",
-                func=self._generate_resume_tool,
+                args_schema=GenerateDocumentInput,
+                **structured(self._generate_resume_tool),
                 description=(
                     "Generates a tailored resume optimized for a specific job. "
-                    "Input should be JSON with 'resume_text', 'job_text', and 'format' (pdf/docx). "
                     "Returns the file path to the generated resume. "
                     "Use this when user wants to create a job-specific resume."
                 )
             ),
-            Tool(
+            StructuredTool(
                 name="generate_cover_letter",
-                func=self._generate_cover_letter_tool,
+                args_schema=GenerateDocumentInput,
+                **structured(self._generate_cover_letter_tool),
                 description=(
                     "Generates a personalized cover letter for a job application. "
-                    "Input should be JSON with 'resume_text', 'job_text', and 'format' (pdf/docx). "
                     "Returns the file path to the generated cover letter. "
                     "Use this when user wants to create a cover letter."
                 )
             ),
-            Tool(
+            StructuredTool(
+                name="generate_application_package",
+                args_schema=GenerateDocumentInput,
+                **structured(self._generate_package_tool),
+                description=(
+                    "Generates a tailored resume and a cover letter together in one step. "
+                    "Returns the file paths to both generated documents. "
+                    "Prefer this over calling generate_tailored_resume and generate_cover_letter separately."
+                )
+            ),
+            StructuredTool(
                 name="send_application_email",
-                func=self._send_email_tool,
+                args_schema=SendEmailInput,
+                **structured(self._send_email_tool),
                 description=(
                     "Sends a job application email with resume and cover letter attachments. "
-                    "Input should be JSON with 'recipient_email', 'subject', 'body', "
-                    "'resume_path', and 'cover_letter_path'. "
                     "Returns success status. Use this to submit applications via email."
                 )
             ),
-            Tool(
+            StructuredTool(
                 name="validate_documents",
-                func=self._validate_documents_tool,
+                args_schema=ValidateDocumentsInput,
+                **structured(self._validate_documents_tool),
                 description=(
                     "Validates that generated documents exist and are accessible. "
-                    "Input should be JSON with 'resume_path' and/or 'cover_letter_path'. "
                     "Returns validation status. Use this before sending emails."
                 )
             )
@@ -158,39 +324,64 @@ class CareerAgentService:
         return tools
     
     def _create_agent(self) -> AgentExecutor:
-        """Create the ReAct agent with tools"""
+        """Create the structured chat agent with tools"""
         
-        # ReAct prompt template
-        template = """You are an AI Career Assistant Agent that helps users with job applications.
+        # Structured chat prompt: the model names each tool call as a JSON blob,
+        # which is parsed directly instead of scraping Action/Action Input lines
+        system = """You are an AI Career Assistant Agent that helps users with job applications.
 You have access to tools that can parse PDFs, analyze documents, generate tailored resumes and cover letters, and send emails.
 
 You should think step-by-step about what the user needs and use the appropriate tools to help them.
 
+For a full job application, the usual plan is: parse_pdf for the resume and the job description,
+analyze_job_description and analyze_resume, analyze_skill_gap, generate_application_package,
+validate_documents, then send_application_email only if the user asked for it.
+Skip any step the user does not need and give the Final Answer as soon as the request is done.
+
 TOOLS:
 {tools}
 
-TOOL NAMES: {tool_names}
+Use a json blob to specify a tool by providing an "action" key (tool name) and an "action_input" key (tool arguments).
+
+Valid "action" values: "Final Answer" or {tool_names}
+
+Provide only ONE action per $JSON_BLOB, as shown:
+
+```
+{{
+  "action": $TOOL_NAME,
+  "action_input": $INPUT
+}}
+```
 
 Use the following format:
 
 Question: the input question you must answer
 Thought: you should always think about what to do
-Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action
+Action:
+```
+$JSON_BLOB
+```
 Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
+... (this Thought/Action/Observation can repeat N times)
 Thought: I now know the final answer
-Final Answer: the final answer to the original input question
-
-Begin!
+Action:
+```
+{{
+  "action": "Final Answer",
+  "action_input": "the final answer to the original input question"
+}}
+```
 
-Question: {input}
-Thought: {agent_scratchpad}"""
+Begin! Always respond with a valid json blob of a single action."""
 
-        prompt = PromptTemplate.from_template(template)
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system),
+            ("human", "{input}\n\n{agent_scratchpad}")
+        ])
         
         # Create agent
-        agent = create_react_agent(
+        agent = create_structured_chat_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=prompt
@@ -201,20 +392,39 @@ Thought: {agent_scratchpad}"""
             agent=agent,
             tools=self.tools,
             verbose=True,
-            max_iterations=15,
+            # The longest realistic plan is 7 tool calls; stop runs that go in circles
+            max_iterations=8,
+            max_execution_time=60,
             handle_parsing_errors=True,
             return_intermediate_steps=True
         )
         
         return agent_executor
     
+    @staticmethod
+    def _from_args(tool_fn: Callable[[str], Awaitable[str]], json_input: bool = True) -> Callable[..., Awaitable[str]]:
+        """
+        Adapt a tool method that takes one string to the structured arguments the agent sends
+        
+        Args:
+            tool_fn: Tool method taking raw text or a JSON string
+            json_input: Pass the arguments as a JSON object rather than a single text value
+        """
+        async def call(*args: Any, **kwargs: Any) -> str:
+            # A bare string action_input arrives as a positional argument
+            if args:
+                return await tool_fn(args[0])
+            if json_input:
+                return await tool_fn(_dumps(kwargs))
+            return await tool_fn(next(iter(kwargs.values()), ""))
+        return call
+    
     # Tool Implementation Methods
     
-    def _parse_pdf_tool(self, file_path: str) -> str:
+    async def _parse_pdf_tool(self, file_path: str) -> str:
         """Tool wrapper for PDF parsing"""
         try:
-            import asyncio
-            text = asyncio.run(self.pdf_parser.extract_text_from_pdf(file_path))
+            text = await self.pdf_parser.extract_text_from_pdf(file_path)
             self._log_action("parse_pdf", {"file_path": file_path}, {"success": True})
             return text
         except Exception as e:
@@ -222,34 +432,51 @@ Thought: {agent_scratchpad}"""
             self._log_action("parse_pdf", {"file_path": file_path}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _analyze_job_tool(self, job_text: str) -> str:
+    async def _analyze_job_tool(self, job_text: str) -> str:
         """Tool wrapper for job description analysis"""
         try:
-            import asyncio
-            result = asyncio.run(self.gemini_service.analyze_job_description(job_text))
+            result = await self.gemini_service.analyze_job_description(job_text)
             self._log_action("analyze_job_description", {"text_length": len(job_text)}, {"success": True})
-            return json.dumps(result, indent=2)
+            return _dumps(result)
         except Exception as e:
             error_msg = f"Error analyzing job: {str(e)}"
             self._log_action("analyze_job_description", {}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _analyze_resume_tool(self, resume_text: str) -> str:
+    async def _analyze_jobs_batch_tool(self, input_json: str) -> str:
+        """Tool wrapper for batched job description analysis"""
+        try:
+            data = _loads(input_json)
+            texts = data.get("texts", [])
+            batch_size = data.get("batch_size", 3)
+            
+            results = await self.gemini_service.analyze_jobs_batch(texts, batch_size=batch_size)
+            self._log_action(
+                "analyze_job_descriptions_batch",
+                {"num_texts": len(texts), "batch_size": batch_size},
+                {"success": True}
+            )
+            return _dumps(results)
+        except Exception as e:
+            error_msg = f"Error analyzing job batch: {str(e)}"
+            self._log_action("analyze_job_descriptions_batch", {}, {"success": False, "error": error_msg})
+            return error_msg
+    
+    async def _analyze_resume_tool(self, resume_text: str) -> str:
         """Tool wrapper for resume analysis"""
         try:
-            import asyncio
-            result = asyncio.run(self.gemini_service.analyze_resume(resume_text))
+            result = await self.gemini_service.analyze_resume(resume_text)
             self._log_action("analyze_resume", {"text_length": len(resume_text)}, {"success": True})
-            return json.dumps(result, indent=2)
+            return _dumps(result)
         except Exception as e:
             error_msg = f"Error analyzing resume: {str(e)}"
             self._log_action("analyze_resume", {}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _analyze_skill_gap_tool(self, input_json: str) -> str:
+    async def _analyze_skill_gap_tool(self, input_json: str) -> str:
         """Tool wrapper for skill gap analysis"""
         try:
-            data = json.loads(input_json)
+            data = _loads(input_json)
             job_skills = data.get("job_skills", [])
             candidate_skills = data.get("candidate_skills", [])
             
@@ -262,33 +489,34 @@ Thought: {agent_scratchpad}"""
             result["match_percentage"] = match_percentage
             
             self._log_action("analyze_skill_gap", {"num_job_skills": len(job_skills)}, {"success": True})
-            return json.dumps(result, indent=2)
+            return _dumps(result)
         except Exception as e:
             error_msg = f"Error analyzing skill gap: {str(e)}"
             self._log_action("analyze_skill_gap", {}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _generate_resume_tool(self, input_json: str) -> str:
+    async def _generate_resume_tool(self, input_json: str) -> str:
         """Tool wrapper for resume generation"""
         try:
-            import asyncio
-            import uuid
-            
-            data = json.loads(input_json)
+            data = _loads(input_json)
             resume_text = data.get("resume_text", "")
             job_text = data.get("job_text", "")
             format_type = data.get("format", "pdf")
             
-            # Generate content
-            content = asyncio.run(self.gemini_service.generate_tailored_resume(resume_text, job_text))
-            
-            # Generate file
-            filename = f"tailored_resume_{uuid.uuid4().hex[:8]}.{format_type}"
-            
-            if format_type == "pdf":
-                file_path = self.document_generator.generate_pdf_resume(content, filename)
-            else:
-                file_path = self.document_generator.generate_docx_resume(content, filename)
+            # Reuse the file from an identical earlier request if there is one
+            filename = self._document_filename("tailored_resume", resume_text, job_text, format_type)
+            async with self._document_lock(filename):
+                file_path = self._existing_document(filename)
+                
+                if file_path is None:
+                    # Generate content
+                    content = await self.gemini_service.generate_tailored_resume(resume_text, job_text)
+                    
+                    if format_type == "pdf":
+                        write = self.document_generator.generate_pdf_resume
+                    else:
+                        write = self.document_generator.generate_docx_resume
+                    file_path = await self._write_atomically(write, content, filename)
             
             self._log_action("generate_tailored_resume", {"format": format_type}, {"success": True, "file": filename})
             return f"Resume generated successfully at: {file_path}"
@@ -298,27 +526,28 @@ Thought: {agent_scratchpad}"""
             self._log_action("generate_tailored_resume", {}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _generate_cover_letter_tool(self, input_json: str) -> str:
+    async def _generate_cover_letter_tool(self, input_json: str) -> str:
         """Tool wrapper for cover letter generation"""
         try:
-            import asyncio
-            import uuid
-            
-            data = json.loads(input_json)
+            data = _loads(input_json)
             resume_text = data.get("resume_text", "")
             job_text = data.get("job_text", "")
             format_type = data.get("format", "pdf")
             
-            # Generate content
-            content = asyncio.run(self.gemini_service.generate_cover_letter(resume_text, job_text))
-            
-            # Generate file
-            filename = f"cover_letter_{uuid.uuid4().hex[:8]}.{format_type}"
-            
-            if format_type == "pdf":
-                file_path = self.document_generator.generate_pdf_cover_letter(content, filename)
-            else:
-                file_path = self.document_generator.generate_docx_cover_letter(content, filename)
+            # Reuse the file from an identical earlier request if there is one
+            filename = self._document_filename("cover_letter", resume_text, job_text, format_type)
+            async with self._document_lock(filename):
+                file_path = self._existing_document(filename)
+                
+                if file_path is None:
+                    # Generate content
+                    content = await self.gemini_service.generate_cover_letter(resume_text, job_text)
+                    
+                    if format_type == "pdf":
+                        write = self.document_generator.generate_pdf_cover_letter
+                    else:
+                        write = self.document_generator.generate_docx_cover_letter
+                    file_path = await self._write_atomically(write, content, filename)
             
             self._log_action("generate_cover_letter", {"format": format_type}, {"success": True, "file": filename})
             return f"Cover letter generated successfully at: {file_path}"
@@ -328,32 +557,150 @@ Thought: {agent_scratchpad}"""
             self._log_action("generate_cover_letter", {}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _send_email_tool(self, input_json: str) -> str:
-        """Tool wrapper for sending emails"""
+    async def _generate_package_tool(self, input_json: str) -> str:
+        """Tool wrapper for generating a resume and cover letter together"""
         try:
-            import asyncio
-            import os
+            data = _loads(input_json)
+            resume_text = data.get("resume_text", "")
+            job_text = data.get("job_text", "")
+            format_type = data.get("format", "pdf")
             
-            data = json.loads(input_json)
+            resume_file, cover_letter_file, _ = await self._generate_package(resume_text, job_text, format_type)
             
-            # Get email configuration
-            smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-            smtp_port = int(os.getenv("SMTP_PORT", "587"))
-            sender_email = os.getenv("SENDER_EMAIL")
-            sender_password = os.getenv("SENDER_PASSWORD")
+            self._log_action(
+                "generate_application_package",
+                {"format": format_type},
+                {"success": True, "files": [os.path.basename(resume_file), os.path.basename(cover_letter_file)]}
+            )
+            return (
+                f"Resume generated successfully at: {resume_file}\n"
+                f"Cover letter generated successfully at: {cover_letter_file}"
+            )
             
-            if not sender_email or not sender_password:
-                return "Error: Email not configured. Please set SENDER_EMAIL and SENDER_PASSWORD environment variables."
+        except Exception as e:
+            error_msg = f"Error generating application package: {str(e)}"
+            self._log_action("generate_application_package", {}, {"success": False, "error": error_msg})
+            return error_msg
+    
+    async def _generate_package(
+        self,
+        resume_text: str,
+        job_text: str,
+        format_type: str,
+        need_cover_letter_text: bool = False
+    ) -> Tuple[str, str, Optional[str]]:
+        """
+        Generate the tailored resume and cover letter, reusing recent identical files
+        
+        Only documents without a reusable file are generated; when both are
+        missing they come from a single application pack request.
+        
+        Args:
+            resume_text: Original resume text
+            job_text: Job description text
+            format_type: Output format (pdf/docx)
+            need_cover_letter_text: Also return the cover letter text when its file is reused
             
-            email_service = EmailService(smtp_server, smtp_port, sender_email, sender_password)
+        Returns:
+            Resume file path, cover letter file path and cover letter content
+            (None if the file was reused and need_cover_letter_text is False)
+        """
+        if format_type == "pdf":
+            write_resume = self.document_generator.generate_pdf_resume
+            write_cover_letter = self.document_generator.generate_pdf_cover_letter
+        else:
+            write_resume = self.document_generator.generate_docx_resume
+            write_cover_letter = self.document_generator.generate_docx_cover_letter
+        resume_filename = self._document_filename("tailored_resume", resume_text, job_text, format_type)
+        cover_letter_filename = self._document_filename("cover_letter", resume_text, job_text, format_type)
+        
+        # Always resume before cover letter, so concurrent packages can't deadlock
+        async with self._document_lock(resume_filename), self._document_lock(cover_letter_filename):
+            resume_file = self._existing_document(resume_filename)
+            cover_letter_file = self._existing_document(cover_letter_filename)
+            resume_content = cover_letter_content = None
+            
+            if resume_file is None and cover_letter_file is None:
+                pack = await self.gemini_service.generate_application_pack(resume_text, job_text)
+                resume_content, cover_letter_content = pack["resume"], pack["cover_letter"]
+            elif resume_file is None:
+                resume_content = await self.gemini_service.generate_tailored_resume(resume_text, job_text)
+            if cover_letter_content is None and (cover_letter_file is None or need_cover_letter_text):
+                cover_letter_content = await self.gemini_service.generate_cover_letter(resume_text, job_text)
+            
+            writes = []
+            if resume_file is None:
+                writes.append(self._write_atomically(write_resume, resume_content, resume_filename))
+            if cover_letter_file is None:
+                writes.append(self._write_atomically(write_cover_letter, cover_letter_content, cover_letter_filename))
+            written = iter(await asyncio.gather(*writes))
+            if resume_file is None:
+                resume_file = next(written)
+            if cover_letter_file is None:
+                cover_letter_file = next(written)
+        
+        return resume_file, cover_letter_file, cover_letter_content
+    
+    @staticmethod
+    def _document_filename(prefix: str, resume_text: str, job_text: str, format_type: str) -> str:
+        """Name a generated document by a digest of its inputs, so identical requests share one file"""
+        hasher = hashlib.blake2b(digest_size=8)
+        for part in (resume_text, job_text, format_type):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\0")
+        return f"{prefix}_{hasher.hexdigest()}.{format_type}"
+    
+    def _document_lock(self, filename: str) -> asyncio.Lock:
+        """Return the lock guarding generation of one document"""
+        lock = self._document_locks.get(filename)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._document_locks[filename] = lock
+        return lock
+    
+    def _existing_document(self, filename: str) -> Optional[str]:
+        """Return the path of a document generated within DOCUMENT_REUSE_TTL, or None"""
+        file_path = os.path.join(self.document_generator.output_dir, filename)
+        try:
+            modified = os.stat(file_path).st_mtime
+        except OSError:
+            return None
+        return file_path if time.time() - modified < DOCUMENT_REUSE_TTL else None
+    
+    async def _write_atomically(self, write: Callable[[str, str], str], content: str, filename: str) -> str:
+        """
+        Write a document in a worker thread under a temporary name, then move it into place
+        
+        Readers never see a partly written file under the final name.
+        """
+        temp_filename = f".{os.urandom(4).hex()}.{filename}"
+        temp_path = os.path.join(self.document_generator.output_dir, temp_filename)
+        file_path = os.path.join(self.document_generator.output_dir, filename)
+        try:
+            await asyncio.to_thread(write, content, temp_filename)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            # Don't leave a partial temporary file behind
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return file_path
+    
+    async def _send_email_tool(self, input_json: str) -> str:
+        """Tool wrapper for sending emails"""
+        try:
+            data = _loads(input_json)
+            
+            if self.email_service is None:
+                return "Error: Email not configured. Please set SENDER_EMAIL and SENDER_PASSWORD environment variables."
             
-            success = asyncio.run(email_service.send_application_email(
+            success = await self.email_service.send_application_email(
                 recipient_email=data["recipient_email"],
                 subject=data["subject"],
                 body=data["body"],
                 attachment_paths=[data.get("resume_path"), data.get("cover_letter_path")],
                 candidate_name=data.get("candidate_name")
-            ))
+            )
             
             self._log_action("send_application_email", {"recipient": data["recipient_email"]}, {"success": success})
             
@@ -367,100 +714,368 @@ Thought: {agent_scratchpad}"""
             self._log_action("send_application_email", {}, {"success": False, "error": error_msg})
             return error_msg
     
-    def _validate_documents_tool(self, input_json: str) -> str:
+    async def _validate_documents_tool(self, input_json: str) -> str:
         """Tool wrapper for document validation"""
         try:
-            import os
-            
-            data = json.loads(input_json)
+            data = _loads(input_json)
             resume_path = data.get("resume_path")
             cover_letter_path = data.get("cover_letter_path")
             
             results = {}
             
-            if resume_path:
-                results["resume_exists"] = os.path.exists(resume_path)
-                if results["resume_exists"]:
-                    results["resume_size"] = os.path.getsize(resume_path)
-            
-            if cover_letter_path:
-                results["cover_letter_exists"] = os.path.exists(cover_letter_path)
-                if results["cover_letter_exists"]:
-                    results["cover_letter_size"] = os.path.getsize(cover_letter_path)
+            # One stat call per file gives both existence and size
+            for name, path in (("resume", resume_path), ("cover_letter", cover_letter_path)):
+                if not path:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    results[f"{name}_exists"] = False
+                else:
+                    results[f"{name}_exists"] = True
+                    results[f"{name}_size"] = st.st_size
             
             self._log_action("validate_documents", data, {"success": True})
-            return json.dumps(results, indent=2)
+            return _dumps(results)
             
         except Exception as e:
             error_msg = f"Error validating documents: {str(e)}"
             self._log_action("validate_documents", {}, {"success": False, "error": error_msg})
             return error_msg
     
+    def _start_history(self) -> Deque[Dict[str, Any]]:
+        """Start a fresh action history for a run and reset its metrics counters"""
+        history: Deque[Dict[str, Any]] = deque(maxlen=MAX_ACTION_HISTORY)
+        self.action_history = history
+        self._action_counts: Counter = Counter()
+        self._successful_actions = 0
+        return history
+    
     def _log_action(self, action_name: str, inputs: Dict[str, Any], outputs: Dict[str, Any]):
         """Log agent actions for evaluation"""
-        self.action_history.append({
+        history = _run_history.get()
+        if history is None:
+            history = self.action_history
+        
+        # Keep metrics for the latest run up to date as actions are logged
+        if history is self.action_history:
+            if len(history) == history.maxlen:
+                # The oldest action is about to drop out of the history
+                evicted = history[0]
+                self._action_counts[evicted["action"]] -= 1
+                if evicted["outputs"].get("success", False):
+                    self._successful_actions -= 1
+            self._action_counts[action_name] += 1
+            if outputs.get("success", False):
+                self._successful_actions += 1
+        
+        history.append({
             "action": action_name,
             "inputs": inputs,
             "outputs": outputs,
-            "timestamp": __import__('datetime').datetime.now().isoformat()
+            # Raw clock reading; formatted only when the history is exported
+            "ts_ns": time.time_ns()
         })
     
-    async def run(self, user_request: str) -> Dict[str, Any]:
+    async def run(self, user_request: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Run the agent with a user request
         
         Args:
             user_request: Natural language request from user
+            use_cache: Return the result of an identical recent run, if any
             
         Returns:
             Agent response with output and intermediate steps
         """
+        cache_key = None
+        if use_cache and not _EMAIL_INTENT_PATTERN.search(user_request):
+            cache_key = self._run_cache_key(user_request)
+            cached = self._run_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Agent run served from cache")
+                # The cached run is now the latest one, and it called no tools
+                self._start_history()
+                self._total_runs += 1
+                self._cache_hits += 1
+                return dict(cached)
+        
+        result: Dict[str, Any] = {"success": False, "error": "Agent produced no output", "action_history": []}
+        async for event in self.stream_run(user_request):
+            if event["type"] in ("final", "error"):
+                result = event
+        
+        result = dict(result)
+        result.pop("type", None)
+        # A run that sent email is never replayed from cache, whatever the request said
+        sent_email = any(
+            action["action"] == "send_application_email" for action in result.get("action_history") or ()
+        )
+        if cache_key is not None and result.get("success") and not sent_email:
+            self._run_cache[cache_key] = result
+        return result
+    
+    async def run_batch_async(self, requests: List[str], max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        Run the agent on several requests concurrently
+        
+        Args:
+            requests: Natural language requests from the user
+            max_concurrency: Maximum number of runs in flight at once
+            
+        Returns:
+            Agent responses, in the same order as ``requests``
+        """
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        
+        async def run_one(user_request: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.run(user_request)
+        
+        return await asyncio.gather(*(run_one(user_request) for user_request in requests))
+    
+    @staticmethod
+    def _run_cache_key(user_request: str) -> str:
+        """
+        Build a run cache key from the request text and the PDFs it mentions
+        
+        Referenced files contribute their size and modification time, so a
+        re-uploaded file under the same name does not hit a stale entry.
+        """
+        hasher = hashlib.blake2b(user_request.encode("utf-8"), digest_size=16)
+        for path in _PDF_PATH_PATTERN.findall(user_request):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            hasher.update(f"\0{path}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+        return hasher.hexdigest()
+    
+    async def stream_run(self, user_request: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the agent with a user request, yielding events as it works
+        
+        Each agent step is reported as soon as it happens, so a caller can show
+        progress instead of waiting for the final answer.
+        
+        Args:
+            user_request: Natural language request from user
+            
+        Yields:
+            ``action`` events when the agent picks a tool, ``observation`` events
+            with the tool's result, then a single ``final`` or ``error`` event
+        """
+        # Fresh action history for this run
+        history = self._start_history()
+        self._total_runs += 1
+        events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        
+        async def produce():
+            # Runs in its own task, so the run's history is set in a context
+            # that the executor and its tool tasks inherit
+            _run_history.set(history)
+            finished = False
+            try:
+                async for chunk in self.agent_executor.astream({"input": user_request}):
+                    for action in chunk.get("actions", []):
+                        await events.put({
+                            "type": "action",
+                            "tool": action.tool,
+                            "tool_input": action.tool_input,
+                            "log": action.log
+                        })
+                    for step in chunk.get("steps", []):
+                        await events.put({
+                            "type": "observation",
+                            "tool": step.action.tool,
+                            "observation": str(step.observation)
+                        })
+                    if "output" in chunk:
+                        finished = True
+                        await events.put({
+                            "type": "final",
+                            "success": True,
+                            "output": chunk.get("output", ""),
+                            "intermediate_steps": chunk.get("intermediate_steps", []),
+                            "action_history": _export_history(history)
+                        })
+                if not finished:
+                    await events.put({
+                        "type": "error",
+                        "success": False,
+                        "error": "Agent produced no output",
+                        "action_history": _export_history(history)
+                    })
+            except Exception as e:
+                logger.error(f"Agent execution error: {str(e)}")
+                await events.put({
+                    "type": "error",
+                    "success": False,
+                    "error": str(e),
+                    "action_history": _export_history(history)
+                })
+            finally:
+                await events.put(None)
+        
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # Stop the run if the caller stops listening
+            if not producer.done():
+                producer.cancel()
+    
+    async def run_plan(
+        self,
+        resume_path: Optional[str] = None,
+        job_path: Optional[str] = None,
+        format_type: str = "pdf",
+        recipient_email: Optional[str] = None,
+        resume_text: Optional[str] = None,
+        job_text: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the full application workflow as a fixed graph of tool calls
+        
+        Unlike run(), no LLM planning step is involved: independent steps run
+        concurrently (parse resume || parse job, analyze resume || analyze job,
+        generate resume || generate cover letter), so wall-clock time is the
+        longest branch at each stage rather than the sum of all calls.
+        
+        Args:
+            resume_path: Path to the resume PDF
+            job_path: Path to the job description PDF
+            format_type: Output format for generated documents (pdf/docx)
+            recipient_email: If given, email the generated documents here
+            resume_text: Already extracted resume text; skips parsing both PDFs
+                when given together with job_text
+            job_text: Already extracted job description text
+            
+        Returns:
+            Agent response with output and action history
+        """
+        history = self._start_history()
+        self._total_runs += 1
+        token = _run_history.set(history)
+        
         try:
-            # Clear action history for new run
-            self.action_history = []
+            # Parse both PDFs, unless their text was already extracted
+            if resume_text is None or job_text is None:
+                resume_text, job_text = await asyncio.gather(
+                    self.pdf_parser.extract_text_from_pdf(resume_path),
+                    self.pdf_parser.extract_text_from_pdf(job_path)
+                )
+                for path, text in ((resume_path, resume_text), (job_path, job_text)):
+                    self._log_action("parse_pdf", {"file_path": path}, {"success": text is not None})
+            if not resume_text or not job_text:
+                raise ValueError("Could not extract text from the resume or job description")
+            
+            # Analyze both documents
+            job_analysis, resume_analysis = await asyncio.gather(
+                self.gemini_service.analyze_job_description(job_text),
+                self.gemini_service.analyze_resume(resume_text)
+            )
+            self._log_action("analyze_job_description", {"text_length": len(job_text)}, {"success": True})
+            self._log_action("analyze_resume", {"text_length": len(resume_text)}, {"success": True})
+            
+            # Skill gap
+            job_skills = job_analysis.get("required_skills", []) + job_analysis.get("preferred_skills", [])
+            skill_gap = self.skill_analyzer.analyze_skill_gap(job_skills, resume_analysis.get("skills", []))
+            match_percentage = self.skill_analyzer.calculate_match_percentage(
+                len(skill_gap["matching_skills"]),
+                len(skill_gap["partial_skills"]),
+                len(job_skills)
+            )
+            self._log_action("analyze_skill_gap", {"num_job_skills": len(job_skills)}, {"success": True})
+            
+            # Generate both documents
+            resume_file, cover_letter_file, cover_letter_content = await self._generate_package(
+                resume_text, job_text, format_type, need_cover_letter_text=bool(recipient_email)
+            )
+            self._log_action("generate_tailored_resume", {"format": format_type}, {"success": True, "file": os.path.basename(resume_file)})
+            self._log_action("generate_cover_letter", {"format": format_type}, {"success": True, "file": os.path.basename(cover_letter_file)})
+            
+            # Validate
+            documents_valid = os.path.isfile(resume_file) and os.path.isfile(cover_letter_file)
+            self._log_action("validate_documents", {"resume_path": resume_file, "cover_letter_path": cover_letter_file}, {"success": documents_valid})
+            
+            output = (
+                f"Match: {match_percentage}%. "
+                f"Resume generated at: {resume_file}. "
+                f"Cover letter generated at: {cover_letter_file}."
+            )
             
-            # Run agent
-            result = self.agent_executor.invoke({"input": user_request})
+            # Send email
+            if recipient_email and documents_valid:
+                email_result = await self._send_email_tool(_dumps({
+                    "recipient_email": recipient_email,
+                    "subject": f"Application for {job_analysis.get('job_title', 'the position')}",
+                    "body": cover_letter_content,
+                    "resume_path": resume_file,
+                    "cover_letter_path": cover_letter_file
+                }))
+                output += f" {email_result}"
             
             return {
-                "success": True,
-                "output": result.get("output", ""),
-                "intermediate_steps": result.get("intermediate_steps", []),
-                "action_history": self.action_history
+                "success": documents_valid,
+                "output": output,
+                "action_history": _export_history(history)
             }
             
         except Exception as e:
-            logger.error(f"Agent execution error: {str(e)}")
+            logger.error(f"Agent plan execution error: {str(e)}")
             return {
                 "success": False,
                 "error": str(e),
-                "action_history": self.action_history
+                "action_history": _export_history(history)
             }
+        finally:
+            _run_history.reset(token)
     
-    def get_metrics(self) -> Dict[str, Any]:
+    def get_recent_actions(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Get the most recent actions of the latest run
+        
+        Args:
+            n: Maximum number of actions to return
+            
+        Returns:
+            Up to ``n`` actions, oldest first
+        """
+        history = self.action_history
+        return _export_history(islice(history, max(len(history) - n, 0), None))
+    
+    def get_metrics(self, include_history: bool = False) -> Dict[str, Any]:
         """
         Get agent performance metrics for evaluation
         
+        Args:
+            include_history: Also return the full action history of the latest run
+            
         Returns:
-            Dictionary with performance metrics
+            Dictionary with performance metrics of the latest run, plus lifetime
+            total_runs and cache_hits counts
         """
+        run_counts = {"total_runs": self._total_runs, "cache_hits": self._cache_hits}
         if not self.action_history:
-            return {"message": "No actions recorded yet"}
+            return {"message": "No actions recorded yet", **run_counts}
         
         total_actions = len(self.action_history)
-        successful_actions = sum(1 for action in self.action_history if action["outputs"].get("success", False))
+        successful_actions = self._successful_actions
         failed_actions = total_actions - successful_actions
         
-        action_types = {}
-        for action in self.action_history:
-            action_name = action["action"]
-            action_types[action_name] = action_types.get(action_name, 0) + 1
-        
-        return {
+        metrics = {
             "total_actions": total_actions,
             "successful_actions": successful_actions,
             "failed_actions": failed_actions,
             "success_rate": (successful_actions / total_actions * 100) if total_actions > 0 else 0,
-            "action_breakdown": action_types,
-            "action_history": self.action_history
+            "action_breakdown": {name: count for name, count in self._action_counts.items() if count},
+            **run_counts
         }
+        if include_history:
+            metrics["action_history"] = _export_history(self.action_history)
+        return metrics
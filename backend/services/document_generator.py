@@ -6,14 +6,48 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+import io
 import os
 import logging
 import re
-from typing import Optional, List, Tuple
+from functools import lru_cache
+from typing import List, Tuple
 from datetime import datetime
+from services.error_logging import log_errors
 
 logger = logging.getLogger(__name__)
 
+# One markdown token per match, tried in order: **bold**, *italic*, _italic_,
+# a run of plain text, or (when a marker is left unclosed) the rest of the line
+_MD_TOKEN_RE = re.compile(r"\*\*(.*?)\*\*|\*([^*]+)\*|_([^_]+)_|([^*_]+)|(.+)", re.DOTALL)
+
+# Markdown emphasis rewritten to ReportLab markup; an asterisk right after
+# "<" is left alone so it is never read as the start of an italic run
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*", re.DOTALL)
+_ITALIC_RE = re.compile(r"(?<!<)\*([^*]*)\*")
+
+# Characters ReportLab's paragraph markup parser treats specially
+_HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+# A content line as (kind, stripped line, text), where kind is "blank", "heading",
+# "bullet" or "para" and text drops the heading or bullet marker
+ContentLine = Tuple[str, str, str]
+
+# (is_bold, is_italic) for each capturing group of _MD_TOKEN_RE
+_MD_TOKEN_FLAGS = {
+    1: (True, False),
+    2: (False, True),
+    3: (False, True),
+    4: (False, False),
+    5: (False, False),
+}
+
+# (top/bottom, left/right) page margins for each DOCX template
+_DOCX_MARGINS = {
+    "resume": (Inches(0.5), Inches(0.75)),
+    "cover_letter": (Inches(1), Inches(1)),
+}
+
 class DocumentGenerator:
     """Service for generating resume and cover letter documents"""
     
@@ -24,63 +58,114 @@ class DocumentGenerator:
         Args:
             output_dir: Directory to save generated documents
         """
-        self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+        # Store the canonical absolute path so generated file paths can be opened directly
+        self.output_dir = os.path.abspath(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        # PDF paragraph styles, built once and shared by every generated file
+        styles = getSampleStyleSheet()
+        self._resume_styles = {
+            'CustomHeading': ParagraphStyle(
+                name='CustomHeading',
+                parent=styles['Heading1'],
+                fontSize=14,
+                textColor=RGBColor(0, 51, 102),
+                spaceAfter=12,
+                spaceBefore=12,
+                bold=True
+            ),
+            'CustomBody': ParagraphStyle(
+                name='CustomBody',
+                parent=styles['Normal'],
+                fontSize=10,
+                spaceAfter=6
+            ),
+        }
+        self._cover_styles = {
+            'CoverLetterBody': ParagraphStyle(
+                name='CoverLetterBody',
+                parent=styles['Normal'],
+                fontSize=11,
+                spaceAfter=12,
+                alignment=TA_JUSTIFY
+            ),
+        }
     
-    def parse_markdown_text(self, text: str) -> List[Tuple[str, bool, bool]]:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def parse_markdown_text(text: str) -> Tuple[Tuple[str, bool, bool], ...]:
         """
-        Parse markdown text and return list of (text, is_bold, is_italic) tuples
+        Parse markdown text and return (text, is_bold, is_italic) tuples
+        
+        Results are cached per line, since bullets and headings repeat across
+        the resume and cover letter and across their DOCX and PDF versions.
         
         Args:
             text: Text with markdown formatting
             
         Returns:
-            List of tuples with text and formatting flags
+            Tuple of tuples with text and formatting flags
         """
-        result = []
-        i = 0
-        
-        while i < len(text):
-            # Check for bold (**text**)
-            if i < len(text) - 1 and text[i:i+2] == '**':
-                # Find the closing **
-                end = text.find('**', i + 2)
-                if end != -1:
-                    bold_text = text[i+2:end]
-                    result.append((bold_text, True, False))
-                    i = end + 2
-                    continue
-            
-            # Check for italic (*text* or _text_)
-            if text[i] in ['*', '_']:
-                marker = text[i]
-                end = text.find(marker, i + 1)
-                if end != -1 and end - i > 1:
-                    italic_text = text[i+1:end]
-                    result.append((italic_text, False, True))
-                    i = end + 1
-                    continue
-            
-            # Regular text - find next markdown marker
-            next_marker = len(text)
-            for marker_pos in [text.find('**', i), text.find('*', i), text.find('_', i)]:
-                if marker_pos != -1 and marker_pos < next_marker:
-                    next_marker = marker_pos
+        return tuple(
+            (match.group(match.lastindex), *_MD_TOKEN_FLAGS[match.lastindex])
+            for match in _MD_TOKEN_RE.finditer(text)
+        )
+    
+    @staticmethod
+    def _tokenize_content(content: str) -> List[ContentLine]:
+        """
+        Split content into stripped lines classified by kind
+        
+        Args:
+            content: Document content with markdown formatting
             
-            if next_marker > i:
-                regular_text = text[i:next_marker]
-                if regular_text:
-                    result.append((regular_text, False, False))
-                i = next_marker
+        Returns:
+            List of (kind, line, text) tuples
+        """
+        lines = []
+        for line in content.split('\n'):
+            line = line.strip()
+            if not line:
+                lines.append(("blank", line, line))
+            elif line.startswith('##'):
+                lines.append(("heading", line, line.replace('#', '').strip()))
+            elif line.startswith('- ') or line.startswith('• '):
+                lines.append(("bullet", line, line[2:].strip()))
             else:
-                # No more markers, add rest of text
-                remaining = text[i:]
-                if remaining:
-                    result.append((remaining, False, False))
-                break
+                lines.append(("para", line, line))
+        return lines
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _docx_template(document: str) -> bytes:
+        """
+        Build an empty DOCX with margins and heading style preset, once per document type
         
-        return result
+        Args:
+            document: "resume" or "cover_letter"
+            
+        Returns:
+            Serialized template, to be opened fresh for every generated file
+        """
+        doc = Document()
+        vertical, horizontal = _DOCX_MARGINS[document]
+        for section in doc.sections:
+            section.top_margin = vertical
+            section.bottom_margin = vertical
+            section.left_margin = horizontal
+            section.right_margin = horizontal
+        
+        # Resume section headings, applied through the style rather than per run
+        heading_font = doc.styles['Heading 1'].font
+        heading_font.color.rgb = RGBColor(0, 51, 102)
+        heading_font.size = Pt(14)
+        heading_font.bold = True
+        
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
     
+    @log_errors("Error generating DOCX resume")
     def generate_docx_resume(self, content: str, filename: str) -> str:
         """
         Generate a resume in DOCX format
@@ -92,73 +177,56 @@ class DocumentGenerator:
         Returns:
             Path to the generated file
         """
-        try:
-            doc = Document()
-            
-            # Set document margins
-            sections = doc.sections
-            for section in sections:
-                section.top_margin = Inches(0.5)
-                section.bottom_margin = Inches(0.5)
-                section.left_margin = Inches(0.75)
-                section.right_margin = Inches(0.75)
-            
-            # Split content into sections
-            lines = content.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
+        doc = Document(io.BytesIO(self._docx_template("resume")))
+        
+        # Split content into sections
+        lines = self._tokenize_content(content)
+        
+        for kind, line, text in lines:
+            if kind == "blank":
+                continue
+            
+            # Check if it's a heading (starts with ## or ###)
+            if kind == "heading":
+                # Add heading
+                doc.add_heading(text, level=1)
+            elif kind == "bullet":
+                # Bullet point - parse markdown within bullet
+                para = doc.add_paragraph(style='List Bullet')
+                para.paragraph_format.left_indent = Inches(0.25)
                 
-                # Check if it's a heading (starts with ## or ###)
-                if line.startswith('##'):
-                    # Add heading
-                    heading_text = line.replace('#', '').strip()
-                    heading = doc.add_heading(heading_text, level=1)
-                    heading.runs[0].font.color.rgb = RGBColor(0, 51, 102)
-                    heading.runs[0].font.size = Pt(14)
-                    heading.runs[0].font.bold = True
-                elif line.startswith('- ') or line.startswith('• '):
-                    # Bullet point - parse markdown within bullet
-                    bullet_text = line[2:].strip()
-                    para = doc.add_paragraph(style='List Bullet')
-                    para.paragraph_format.left_indent = Inches(0.25)
-                    
-                    # Parse markdown formatting in bullet text
-                    parts = self.parse_markdown_text(bullet_text)
-                    for text, is_bold, is_italic in parts:
-                        run = para.add_run(text)
-                        run.font.bold = is_bold
-                        run.font.italic = is_italic
-                else:
-                    # Normal paragraph - parse markdown formatting
-                    para = doc.add_paragraph()
-                    para.paragraph_format.space_after = Pt(6)
-                    
-                    # Parse markdown formatting
-                    parts = self.parse_markdown_text(line)
-                    for text, is_bold, is_italic in parts:
-                        run = para.add_run(text)
-                        if is_bold:
-                            run.font.bold = True
-                        if is_italic:
-                            run.font.italic = True
-            
-            # Save document
-            file_path = os.path.join(self.output_dir, filename)
-            doc.save(file_path)
-            
-            logger.info(f"Resume DOCX generated: {file_path}")
-            return file_path
-            
-        except Exception as e:
-            logger.error(f"Error generating DOCX resume: {str(e)}")
-            raise
+                # Parse markdown formatting in bullet text
+                parts = self.parse_markdown_text(text)
+                for text, is_bold, is_italic in parts:
+                    run = para.add_run(text)
+                    run.font.bold = is_bold
+                    run.font.italic = is_italic
+            else:
+                # Normal paragraph - parse markdown formatting
+                para = doc.add_paragraph()
+                para.paragraph_format.space_after = Pt(6)
+                
+                # Parse markdown formatting
+                parts = self.parse_markdown_text(line)
+                for text, is_bold, is_italic in parts:
+                    run = para.add_run(text)
+                    if is_bold:
+                        run.font.bold = True
+                    if is_italic:
+                        run.font.italic = True
+        
+        # Save document
+        file_path = os.path.join(self.output_dir, filename)
+        doc.save(file_path)
+        
+        logger.info("Resume DOCX generated: %s", file_path)
+        return file_path
     
-    def convert_markdown_to_html(self, text: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def convert_markdown_to_html(text: str) -> str:
         """
-        Convert markdown formatting to HTML for ReportLab
+        Convert markdown formatting to HTML for ReportLab (cached per line)
         
         Args:
             text: Text with markdown formatting
@@ -166,34 +234,16 @@ class DocumentGenerator:
         Returns:
             HTML formatted text
         """
-        # First escape special HTML characters
-        text = text.replace('&', '&amp;')
+        # First escape special HTML characters, so stray < or > can't break ReportLab's markup
+        text = text.translate(_HTML_ESCAPE)
         
         # Convert **bold** to <b>bold</b>
-        while '**' in text:
-            first = text.find('**')
-            if first == -1:
-                break
-            second = text.find('**', first + 2)
-            if second == -1:
-                break
-            text = text[:first] + '<b>' + text[first+2:second] + '</b>' + text[second+2:]
+        text = _BOLD_RE.sub(r"<b>\1</b>", text)
         
         # Convert *italic* to <i>italic</i>
-        parts = []
-        i = 0
-        while i < len(text):
-            if text[i] == '*' and (i == 0 or text[i-1] != '<'):
-                end = text.find('*', i + 1)
-                if end != -1:
-                    parts.append('<i>' + text[i+1:end] + '</i>')
-                    i = end + 1
-                    continue
-            parts.append(text[i])
-            i += 1
-        
-        return ''.join(parts) if parts else text
+        return _ITALIC_RE.sub(r"<i>\1</i>", text)
     
+    @log_errors("Error generating PDF resume")
     def generate_pdf_resume(self, content: str, filename: str) -> str:
         """
         Generate a resume in PDF format
@@ -205,68 +255,46 @@ class DocumentGenerator:
         Returns:
             Path to the generated file
         """
-        try:
-            file_path = os.path.join(self.output_dir, filename)
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(
-                file_path,
-                pagesize=letter,
-                rightMargin=0.75*inch,
-                leftMargin=0.75*inch,
-                topMargin=0.5*inch,
-                bottomMargin=0.5*inch
-            )
-            
-            # Define styles
-            styles = getSampleStyleSheet()
-            styles.add(ParagraphStyle(
-                name='CustomHeading',
-                parent=styles['Heading1'],
-                fontSize=14,
-                textColor=RGBColor(0, 51, 102),
-                spaceAfter=12,
-                spaceBefore=12,
-                bold=True
-            ))
-            styles.add(ParagraphStyle(
-                name='CustomBody',
-                parent=styles['Normal'],
-                fontSize=10,
-                spaceAfter=6
-            ))
-            
-            # Build document content
-            story = []
-            lines = content.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    story.append(Spacer(1, 0.1*inch))
-                    continue
-                
-                # Check if it's a heading
-                if line.startswith('##'):
-                    heading_text = line.replace('#', '').strip()
-                    # Escape and convert markdown
-                    heading_text = self.convert_markdown_to_html(heading_text)
-                    story.append(Paragraph(heading_text, styles['CustomHeading']))
-                else:
-                    # Convert markdown to HTML for ReportLab
-                    formatted_line = self.convert_markdown_to_html(line)
-                    story.append(Paragraph(formatted_line, styles['CustomBody']))
-            
-            # Build PDF
-            doc.build(story)
-            
-            logger.info(f"Resume PDF generated: {file_path}")
-            return file_path
-            
-        except Exception as e:
-            logger.error(f"Error generating PDF resume: {str(e)}")
-            raise
+        file_path = os.path.join(self.output_dir, filename)
+        
+        # Create PDF document
+        doc = SimpleDocTemplate(
+            file_path,
+            pagesize=letter,
+            rightMargin=0.75*inch,
+            leftMargin=0.75*inch,
+            topMargin=0.5*inch,
+            bottomMargin=0.5*inch
+        )
+        
+        styles = self._resume_styles
+        
+        # Build document content
+        story = []
+        lines = self._tokenize_content(content)
+        
+        for kind, line, text in lines:
+            if kind == "blank":
+                story.append(Spacer(1, 0.1*inch))
+                continue
+            
+            # Check if it's a heading
+            if kind == "heading":
+                # Escape and convert markdown
+                heading_text = self.convert_markdown_to_html(text)
+                story.append(Paragraph(heading_text, styles['CustomHeading']))
+            else:
+                # Convert markdown to HTML for ReportLab
+                formatted_line = self.convert_markdown_to_html(line)
+                story.append(Paragraph(formatted_line, styles['CustomBody']))
+        
+        # Build PDF
+        doc.build(story)
+        
+        logger.info("Resume PDF generated: %s", file_path)
+        return file_path
     
+    @log_errors("Error generating DOCX cover letter")
     def generate_docx_cover_letter(self, content: str, filename: str) -> str:
         """
         Generate a cover letter in DOCX format
@@ -278,51 +306,38 @@ class DocumentGenerator:
         Returns:
             Path to the generated file
         """
-        try:
-            doc = Document()
-            
-            # Set document margins
-            sections = doc.sections
-            for section in sections:
-                section.top_margin = Inches(1)
-                section.bottom_margin = Inches(1)
-                section.left_margin = Inches(1)
-                section.right_margin = Inches(1)
-            
-            # Add content - skip date as AI should include it
-            lines = content.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    doc.add_paragraph()
-                    continue
-                
-                # Parse markdown formatting for cover letter
-                para = doc.add_paragraph()
-                para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-                para.paragraph_format.space_after = Pt(6)
-                
-                # Parse markdown formatting
-                parts = self.parse_markdown_text(line)
-                for text, is_bold, is_italic in parts:
-                    run = para.add_run(text)
-                    if is_bold:
-                        run.font.bold = True
-                    if is_italic:
-                        run.font.italic = True
-            
-            # Save document
-            file_path = os.path.join(self.output_dir, filename)
-            doc.save(file_path)
-            
-            logger.info(f"Cover letter DOCX generated: {file_path}")
-            return file_path
-            
-        except Exception as e:
-            logger.error(f"Error generating DOCX cover letter: {str(e)}")
-            raise
+        doc = Document(io.BytesIO(self._docx_template("cover_letter")))
+        
+        # Add content - skip date as AI should include it
+        lines = self._tokenize_content(content)
+        
+        for kind, line, text in lines:
+            if kind == "blank":
+                doc.add_paragraph()
+                continue
+            
+            # Parse markdown formatting for cover letter
+            para = doc.add_paragraph()
+            para.alignment = WD_ALIGN_PARAGRAPH.LEFT
+            para.paragraph_format.space_after = Pt(6)
+            
+            # Parse markdown formatting
+            parts = self.parse_markdown_text(line)
+            for text, is_bold, is_italic in parts:
+                run = para.add_run(text)
+                if is_bold:
+                    run.font.bold = True
+                if is_italic:
+                    run.font.italic = True
+        
+        # Save document
+        file_path = os.path.join(self.output_dir, filename)
+        doc.save(file_path)
+        
+        logger.info("Cover letter DOCX generated: %s", file_path)
+        return file_path
     
+    @log_errors("Error generating PDF cover letter")
     def generate_pdf_cover_letter(self, content: str, filename: str) -> str:
         """
         Generate a cover letter in PDF format
@@ -334,52 +349,38 @@ class DocumentGenerator:
         Returns:
             Path to the generated file
         """
-        try:
-            file_path = os.path.join(self.output_dir, filename)
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(
-                file_path,
-                pagesize=letter,
-                rightMargin=1*inch,
-                leftMargin=1*inch,
-                topMargin=1*inch,
-                bottomMargin=1*inch
-            )
-            
-            # Define styles
-            styles = getSampleStyleSheet()
-            styles.add(ParagraphStyle(
-                name='CoverLetterBody',
-                parent=styles['Normal'],
-                fontSize=11,
-                spaceAfter=12,
-                alignment=TA_JUSTIFY
-            ))
-            
-            # Build document content
-            story = []
-            
-            # Skip adding date if AI already includes it in content
-            # Add content
-            lines = content.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    story.append(Spacer(1, 0.1*inch))
-                    continue
-                
-                # Convert markdown to HTML for ReportLab
-                formatted_line = self.convert_markdown_to_html(line)
-                story.append(Paragraph(formatted_line, styles['CoverLetterBody']))
-            
-            # Build PDF
-            doc.build(story)
-            
-            logger.info(f"Cover letter PDF generated: {file_path}")
-            return file_path
-            
-        except Exception as e:
-            logger.error(f"Error generating PDF cover letter: {str(e)}")
-            raise
+        file_path = os.path.join(self.output_dir, filename)
+        
+        # Create PDF document
+        doc = SimpleDocTemplate(
+            file_path,
+            pagesize=letter,
+            rightMargin=1*inch,
+            leftMargin=1*inch,
+            topMargin=1*inch,
+            bottomMargin=1*inch
+        )
+        
+        styles = self._cover_styles
+        
+        # Build document content
+        story = []
+        
+        # Skip adding date if AI already includes it in content
+        # Add content
+        lines = self._tokenize_content(content)
+        
+        for kind, line, text in lines:
+            if kind == "blank":
+                story.append(Spacer(1, 0.1*inch))
+                continue
+            
+            # Convert markdown to HTML for ReportLab
+            formatted_line = self.convert_markdown_to_html(line)
+            story.append(Paragraph(formatted_line, styles['CoverLetterBody']))
+        
+        # Build PDF
+        doc.build(story)
+        
+        logger.info("Cover letter PDF generated: %s", file_path)
+        return file_path
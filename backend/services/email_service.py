@@ -1,14 +1,18 @@
-import smtplib
+import asyncio
+import aiosmtplib
+import aiofiles
 import logging
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+import mimetypes
+import re
+from email.message import EmailMessage
 from typing import List, Optional
 import os
 
 logger = logging.getLogger(__name__)
 
+# Anchored with \Z rather than $, so a trailing newline is not accepted
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\Z')
+
 class EmailService:
     """Service for sending emails with attachments"""
     
@@ -32,6 +36,59 @@ class EmailService:
         self.smtp_port = smtp_port
         self.sender_email = sender_email
         self.sender_password = sender_password
+        
+        # One long-lived SMTP connection, opened on first use and shared by
+        # all sends (a new STARTTLS handshake + login costs hundreds of ms)
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._smtp_lock = asyncio.Lock()
+    
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Return the shared SMTP connection, connecting and logging in if needed"""
+        if self._smtp is None or not self._smtp.is_connected:
+            # Port 465 is implicit TLS (SMTPS); other ports upgrade with STARTTLS
+            implicit_tls = self.smtp_port == 465
+            self._smtp = aiosmtplib.SMTP(
+                hostname=self.smtp_server,
+                port=self.smtp_port,
+                use_tls=implicit_tls,
+                start_tls=not implicit_tls
+            )
+            await self._smtp.connect()
+            await self._smtp.login(self.sender_email, self.sender_password)
+        return self._smtp
+    
+    async def _send_message(self, message: EmailMessage) -> None:
+        """Send a message over the shared connection, reconnecting once if it was dropped"""
+        # A single SMTP connection can only carry one transaction at a time
+        async with self._smtp_lock:
+            smtp = await self._connect()
+            try:
+                await smtp.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                logger.info("SMTP connection was closed by the server, reconnecting")
+                self._smtp = None
+                smtp = await self._connect()
+                await smtp.send_message(message)
+    
+    async def __aenter__(self) -> "EmailService":
+        """Open the shared SMTP connection for a session of sends"""
+        async with self._smtp_lock:
+            await self._connect()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        """Close the shared SMTP connection at the end of the session"""
+        await self.close()
+    
+    async def close(self) -> None:
+        """Close the shared SMTP connection"""
+        async with self._smtp_lock:
+            if self._smtp is not None and self._smtp.is_connected:
+                try:
+                    await self._smtp.quit()
+                except aiosmtplib.SMTPException:
+                    self._smtp.close()
+            self._smtp = None
     
     async def send_application_email(
         self,
@@ -56,48 +113,59 @@ class EmailService:
         """
         try:
             # Create message
-            message = MIMEMultipart()
+            message = EmailMessage()
             message['From'] = self.sender_email
             message['To'] = recipient_email
             message['Subject'] = subject
             
             # Add body
-            message.attach(MIMEText(body, 'plain'))
+            message.set_content(body)
             
-            # Add attachments
-            for file_path in attachment_paths:
-                if not os.path.exists(file_path):
-                    logger.warning(f"Attachment not found: {file_path}")
-                    continue
-                
-                filename = os.path.basename(file_path)
-                
-                with open(file_path, 'rb') as attachment:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment.read())
-                
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {filename}'
-                )
-                
-                message.attach(part)
+            # Read all attachments concurrently
+            attachments_bytes = await asyncio.gather(
+                *[self._read_file(file_path) for file_path in attachment_paths]
+            )
             
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Enable security
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(message)
+            # Add attachments, skipping any that could not be found
+            for file_path, data in zip(attachment_paths, attachments_bytes):
+                if data is not None:
+                    self._attach_file(message, file_path, data)
             
-            logger.info(f"Email sent successfully to {recipient_email}")
+            # Send email without blocking the event loop
+            await self._send_message(message)
+            
+            logger.info("Email sent successfully to %s", recipient_email)
             return True
             
         except Exception as e:
             logger.error(f"Error sending email: {str(e)}")
             return False
     
-    def validate_email(self, email: str) -> bool:
+    @staticmethod
+    async def _read_file(file_path: Optional[str]) -> Optional[bytes]:
+        """Read an attachment from disk without blocking the event loop, or None if it is missing"""
+        if not file_path or not os.path.exists(file_path):
+            logger.warning("Attachment not found: %s", file_path)
+            return None
+        
+        async with aiofiles.open(file_path, 'rb') as attachment:
+            return await attachment.read()
+    
+    @staticmethod
+    def _attach_file(message: EmailMessage, file_path: str, data: bytes) -> None:
+        """
+        Attach file contents to a message with a content type guessed from its name
+        
+        EmailMessage base64-encodes the bytes once, straight into the MIME part,
+        instead of copying them into a MIMEBase payload and re-encoding it.
+        """
+        filename = os.path.basename(file_path)
+        content_type, _ = mimetypes.guess_type(filename)
+        maintype, subtype = (content_type or 'application/octet-stream').split('/', 1)
+        message.add_attachment(data, maintype=maintype, subtype=subtype, filename=filename)
+    
+    @staticmethod
+    def validate_email(email: str) -> bool:
         """
         Basic email validation
         
@@ -107,6 +175,4 @@ class EmailService:
         Returns:
             True if email format is valid
         """
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return _EMAIL_RE.match(email) is not None
@@ -0,0 +1,37 @@
+import functools
+import inspect
+import logging
+
+def log_errors(message: str):
+    """
+    Log any exception raised by the decorated function, then re-raise it
+    
+    The error is logged as "<message>: <error>" on the logger of the module
+    that defines the function, so log output is unchanged from an inline
+    try/except. Works on both plain and async functions.
+    
+    Args:
+        message: Description of the failed operation, e.g. "Error generating PDF resume"
+    """
+    def decorator(func):
+        logger = logging.getLogger(func.__module__)
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    logger.error(f"{message}: {str(e)}")
+                    raise
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"{message}: {str(e)}")
+                raise
+        return wrapper
+    return decorator
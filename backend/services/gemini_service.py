@@ -1,24 +1,188 @@
 import google.generativeai as genai
-import json
+import asyncio
+import orjson
+import re
+import hashlib
+import functools
+import inspect
 import logging
-from typing import Dict, Any, Optional
+from cachetools import Cache, LRUCache, TTLCache
+from typing import Dict, Any, List, Optional, Tuple, Awaitable, Callable
 import os
+from services.error_logging import log_errors
 
 logger = logging.getLogger(__name__)
 
+# A leading "Here's a ..." line the model sometimes adds before a generated document
+_PREAMBLE_RES = {
+    document: re.compile(
+        r"(?:here's a|here is a|below is a|this is a|i've created a) " + re.escape(document) + r"[^\n]*\n",
+        re.IGNORECASE
+    )
+    for document in ("tailored resume", "cover letter")
+}
+
+# A reply wrapped in a markdown code block, optionally tagged json; group 1 is the body
+_CODE_FENCE_RE = re.compile(r"\A```(?:json)?\s*(.*?)(?:\s*```)?\s*\Z", re.DOTALL)
+
+def _memoize(kind: str):
+    """
+    Cache an async GeminiService method's result by a digest of its arguments
+    
+    Concurrent calls with identical arguments share a single in-flight request.
+    Arguments are bound to the method's signature with defaults applied, so
+    positional, keyword and omitted-default forms of one call share a key;
+    ``wrapper.cache_key(self, ...)`` builds that key for seeding the cache.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        def cache_key(self, *args, **kwargs) -> str:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            return self._cache_key(kind, *list(bound.arguments.values())[1:])
+        
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            key = cache_key(self, *args, **kwargs)
+            return await self._get_or_compute(key, lambda: func(self, *args, **kwargs))
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
+
 class GeminiService:
     """Service for interacting with Google Gemini API"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache_size: int = 64, cache_ttl: Optional[float] = None):
         """
         Initialize Gemini service with API key
         
         Args:
             api_key: Google Gemini API key
+            cache_size: Maximum number of results kept in memory
+            cache_ttl: Seconds a cached result stays valid, or None to keep it until evicted
         """
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-2.5-flash')
+        
+        # Results keyed by a digest of the request inputs
+        self.cache_size = cache_size
+        self._cache: Cache = (
+            TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_ttl else LRUCache(maxsize=cache_size)
+        )
+        self._pending: Dict[str, "asyncio.Future[Any]"] = {}
+    
+    @staticmethod
+    def _cache_key(kind: str, *parts: Any) -> str:
+        """Build a cache key from the kind of request and its inputs"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            hasher.update(part.encode("utf-8") if isinstance(part, str) else repr(part).encode("utf-8"))
+            hasher.update(b"\0")
+        return f"{kind}:{hasher.hexdigest()}"
+    
+    def _cache_get(self, key: str) -> Optional[Any]:
+        """Return a cached result and mark it as recently used"""
+        return self._cache.get(key)
+    
+    def _cache_put(self, key: str, value: Any):
+        """Store a result, evicting the least recently used entry when full"""
+        self._cache[key] = value
+    
+    async def _get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached result, joining or starting the request that produces it"""
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        pending = self._pending.get(key)
+        if pending is None:
+            async def run():
+                result = await compute()
+                self._cache_put(key, result)
+                return result
+            
+            pending = asyncio.ensure_future(run())
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+            # Retrieve a failure even if every awaiting caller was cancelled,
+            # so it isn't reported as "Task exception was never retrieved"
+            pending.add_done_callback(lambda task: task.cancelled() or task.exception())
+        
+        # Shield so one cancelled caller does not cancel the request for the others
+        return await asyncio.shield(pending)
+    
+    @staticmethod
+    def _parse_json(result_text: str) -> Any:
+        """
+        Parse a JSON reply, removing the markdown code block it may be wrapped in
+        
+        The pinned SDK cannot request a JSON response type, so the model is
+        only asked for JSON in the prompt and sometimes fences it.
+        """
+        match = _CODE_FENCE_RE.match(result_text)
+        if match:
+            result_text = match.group(1)
+        return orjson.loads(result_text)
+    
+    @staticmethod
+    def _strip_preamble(content: str, document: str) -> str:
+        """
+        Remove a leading "Here's a ..." style line the model sometimes adds
+        
+        Args:
+            content: Generated document text
+            document: Document name used in the preamble, e.g. "cover letter"
+            
+        Returns:
+            Content without the preamble line
+        """
+        # Drop everything up to the first line break after the preamble
+        match = _PREAMBLE_RES[document].match(content)
+        if match:
+            content = content[match.end():].strip()
+        
+        return content
+    
+    @staticmethod
+    def _split_application_pack(result_text: str) -> Optional[Tuple[str, str]]:
+        """
+        Split an application pack reply into its resume and cover letter sections
+        
+        Args:
+            result_text: Raw model reply
+            
+        Returns:
+            (resume, cover letter) text, or None if either marker is missing or a section is empty
+        """
+        resume_pos = result_text.find("===RESUME===")
+        cover_pos = result_text.find("===COVER===")
+        if resume_pos == -1 or cover_pos == -1:
+            return None
+        
+        resume_start = resume_pos + len("===RESUME===")
+        cover_start = cover_pos + len("===COVER===")
+        if resume_pos < cover_pos:
+            resume_part, cover_part = result_text[resume_start:cover_pos], result_text[cover_start:]
+        else:
+            resume_part, cover_part = result_text[resume_start:], result_text[cover_start:resume_pos]
+        
+        resume_part, cover_part = resume_part.strip(), cover_part.strip()
+        if not resume_part or not cover_part:
+            return None
+        return resume_part, cover_part
     
+    async def _generate(self, prompt: str):
+        """
+        Run a blocking generate_content call in a worker thread
+        
+        The SDK client is synchronous, so awaiting it directly would stall the
+        event loop and serialize otherwise concurrent requests.
+        """
+        return await asyncio.to_thread(self.model.generate_content, prompt)
+    
+    @_memoize("job_analysis")
+    @log_errors("Error analyzing job description")
     async def analyze_job_description(self, job_text: str) -> Dict[str, Any]:
         """
         Analyze job description to extract key information
@@ -29,8 +193,7 @@ class GeminiService:
         Returns:
             Dictionary with job analysis
         """
-        try:
-            prompt = f"""
+        prompt = f"""
 Analyze the following job description and extract the information in JSON format.
 
 Job Description:
@@ -50,22 +213,90 @@ Focus on technical skills, soft skills, tools, frameworks, and technologies.
 Extract any contact email addresses mentioned in the job posting.
 Be specific and comprehensive. Return only valid JSON.
 """
+        
+        response = await self._generate(prompt)
+        result_text = response.text.strip()
+        
+        return self._parse_json(result_text)
+    
+    async def analyze_jobs_batch(self, texts: List[str], batch_size: int = 3) -> List[Dict[str, Any]]:
+        """
+        Analyze several job descriptions with one Gemini call per batch
+        
+        Descriptions already analyzed are served from the cache, and the rest are
+        packed ``batch_size`` to a prompt, trading a longer single response for
+        fewer round-trips against the per-minute request limit.
+        
+        Args:
+            texts: Job description texts
+            batch_size: Maximum number of descriptions sent in a single prompt
             
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Clean markdown code blocks if present
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "").strip()
-            
-            return json.loads(result_text)
-            
-        except Exception as e:
-            logger.error(f"Error analyzing job description: {str(e)}")
-            raise
+        Returns:
+            List of job analyses, in the same order as ``texts``
+        """
+        keys = [self.analyze_job_description.cache_key(self, text) for text in texts]
+        results: List[Optional[Dict[str, Any]]] = [self._cache_get(key) for key in keys]
+        
+        # Only send descriptions that are not cached, each distinct text once
+        missing: Dict[str, List[int]] = {}
+        for index, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                missing.setdefault(key, []).append(index)
+        
+        pending = list(missing.values())
+        size = max(batch_size, 1)
+        batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+        analyses = await asyncio.gather(
+            *(self._analyze_job_batch([texts[group[0]] for group in batch]) for batch in batches)
+        )
+        
+        for batch, batch_analyses in zip(batches, analyses):
+            for group, analysis in zip(batch, batch_analyses):
+                self._cache_put(keys[group[0]], analysis)
+                for index in group:
+                    results[index] = analysis
+        
+        return results
+    
+    @log_errors("Error analyzing job description batch")
+    async def _analyze_job_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze a batch of job descriptions in a single prompt"""
+        documents = "\n\n".join(
+            f"<<<DOC_{i}>>>\n{text}\n<<<END_DOC_{i}>>>" for i, text in enumerate(texts)
+        )
+        prompt = f"""
+Analyze the following {len(texts)} job descriptions and return a JSON array of length {len(texts)}.
+Element i of the array must describe the document delimited by <<<DOC_i>>> and <<<END_DOC_i>>>.
+
+Job Descriptions:
+{documents}
+
+Each element must have the following JSON structure:
+{{
+    "job_title": "extracted job title",
+    "company_name": "company name if available, otherwise null",
+    "contact_email": "hiring manager or recruiter email if available, otherwise null",
+    "required_skills": ["skill1", "skill2", ...],
+    "preferred_skills": ["skill1", "skill2", ...],
+    "key_responsibilities": ["responsibility1", "responsibility2", ...]
+}}
+
+Focus on technical skills, soft skills, tools, frameworks, and technologies.
+Extract any contact email addresses mentioned in the job postings.
+Be specific and comprehensive. Return only a valid JSON array.
+"""
+        
+        response = await self._generate(prompt)
+        result_text = response.text.strip()
+        
+        results = self._parse_json(result_text)
+        if not isinstance(results, list) or len(results) != len(texts):
+            raise ValueError(f"Expected a JSON array of {len(texts)} analyses")
+        
+        return results
     
+    @_memoize("resume_analysis")
+    @log_errors("Error analyzing resume")
     async def analyze_resume(self, resume_text: str) -> Dict[str, Any]:
         """
         Analyze resume to extract key information
@@ -76,8 +307,7 @@ Be specific and comprehensive. Return only valid JSON.
         Returns:
             Dictionary with resume analysis
         """
-        try:
-            prompt = f"""
+        prompt = f"""
 Analyze the following resume and extract the information in JSON format.
 
 Resume:
@@ -95,22 +325,14 @@ Please provide the response in the following JSON structure:
 Focus on technical skills, soft skills, work experience, and educational background.
 Be comprehensive and specific. Return only valid JSON.
 """
-            
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Clean markdown code blocks if present
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "").strip()
-            
-            return json.loads(result_text)
-            
-        except Exception as e:
-            logger.error(f"Error analyzing resume: {str(e)}")
-            raise
+        
+        response = await self._generate(prompt)
+        result_text = response.text.strip()
+        
+        return self._parse_json(result_text)
     
+    @_memoize("tailored_resume")
+    @log_errors("Error generating tailored resume")
     async def generate_tailored_resume(
         self,
         resume_text: str,
@@ -128,8 +350,7 @@ Be comprehensive and specific. Return only valid JSON.
         Returns:
             Tailored resume content
         """
-        try:
-            prompt = f"""
+        prompt = f"""
 Create a tailored, professional resume that highlights the candidate's relevant experience and skills for the specific job description.
 
 Original Resume:
@@ -150,33 +371,15 @@ CRITICAL INSTRUCTIONS:
 
 Generate the resume now:
 """
-            
-            response = self.model.generate_content(prompt)
-            content = response.text.strip()
-            
-            # Remove common preambles
-            preambles = [
-                "Here's a tailored resume",
-                "Here is a tailored resume",
-                "Below is a tailored resume",
-                "This is a tailored resume",
-                "I've created a tailored resume",
-            ]
-            
-            for preamble in preambles:
-                if content.lower().startswith(preamble.lower()):
-                    # Find the first line break after preamble and remove everything before it
-                    first_break = content.find('\n')
-                    if first_break != -1:
-                        content = content[first_break:].strip()
-                    break
-            
-            return content
-            
-        except Exception as e:
-            logger.error(f"Error generating tailored resume: {str(e)}")
-            raise
+        
+        response = await self._generate(prompt)
+        content = response.text.strip()
+        
+        # Remove common preambles
+        return self._strip_preamble(content, "tailored resume")
     
+    @_memoize("cover_letter")
+    @log_errors("Error generating cover letter")
     async def generate_cover_letter(
         self,
         resume_text: str,
@@ -198,8 +401,7 @@ Generate the resume now:
         Returns:
             Cover letter content
         """
-        try:
-            prompt = f"""
+        prompt = f"""
 Write a compelling, professional cover letter based on the candidate's resume and the job description.
 
 Resume:
@@ -222,29 +424,87 @@ Format as a proper business letter with actual information extracted from the do
 
 Generate the cover letter now:
 """
+        
+        response = await self._generate(prompt)
+        content = response.text.strip()
+        
+        # Remove common preambles
+        return self._strip_preamble(content, "cover letter")
+    
+    @_memoize("application_pack")
+    @log_errors("Error generating application pack")
+    async def generate_application_pack(self, resume_text: str, job_text: str) -> Dict[str, str]:
+        """
+        Generate the tailored resume and the cover letter with a single prompt
+        
+        Both documents are written from the same resume and job description, so
+        sending those once halves the input tokens and the API round trips.
+        The results also seed the caches of generate_tailored_resume and
+        generate_cover_letter.
+        
+        Args:
+            resume_text: Original resume text
+            job_text: Job description text
             
-            response = self.model.generate_content(prompt)
-            content = response.text.strip()
-            
-            # Remove common preambles
-            preambles = [
-                "Here's a cover letter",
-                "Here is a cover letter",
-                "Below is a cover letter",
-                "This is a cover letter",
-                "I've created a cover letter",
-            ]
-            
-            for preamble in preambles:
-                if content.lower().startswith(preamble.lower()):
-                    # Find the first line break after preamble and remove everything before it
-                    first_break = content.find('\n')
-                    if first_break != -1:
-                        content = content[first_break:].strip()
-                    break
-            
-            return content
-            
-        except Exception as e:
-            logger.error(f"Error generating cover letter: {str(e)}")
-            raise
+        Returns:
+            Dictionary with "resume" and "cover_letter" content
+        """
+        prompt = f"""
+Create two documents for the candidate below: a tailored, professional resume that highlights the candidate's relevant experience and skills for the specific job description, and a compelling, professional cover letter.
+
+Resume:
+{resume_text}
+
+Target Job Description:
+{job_text}
+
+OUTPUT FORMAT:
+Write the line ===RESUME=== followed by the resume, then the line ===COVER=== followed by the cover letter.
+Output nothing before ===RESUME===.
+
+CRITICAL INSTRUCTIONS FOR THE RESUME:
+1. Output ONLY the resume content - NO introductions, explanations, or preambles
+2. Start directly with the candidate's name from the resume
+3. Use ACTUAL information from the resume (real name, email, phone) - NO placeholders like [Your Name], [Your Email]
+4. Use **bold** for important keywords that match the job description
+5. Structure: Professional Summary, Skills, Experience, Education
+6. Make it ATS-friendly with clear section headers
+7. Keep content truthful - only reorganize and emphasize
+8. Use markdown formatting: **bold** for emphasis, ## for section headers
+
+CRITICAL INSTRUCTIONS FOR THE COVER LETTER:
+1. Output ONLY the cover letter body - NO placeholders like [Your Name], [Your Email], [Date]
+2. Use ACTUAL information from the resume (real name, email, phone if mentioned)
+3. Extract company name and job title from the job description
+4. Start directly with the actual date (today's date)
+5. Use **bold** for important keywords and skills that match the job requirements
+6. Structure: Date, Greeting, Opening paragraph, 2-3 body paragraphs, Closing
+7. Keep it professional, concise (3-4 paragraphs), and authentic
+8. End with "Sincerely," followed by the candidate's actual name from resume
+
+Generate both documents now:
+"""
+        
+        response = await self._generate(prompt)
+        sections = self._split_application_pack(response.text)
+        
+        if sections is None:
+            # The model ignored the output format; generate each document on its own instead
+            logger.warning("Application pack reply is missing its section markers, generating documents separately")
+            resume_content, cover_letter_content = await asyncio.gather(
+                self.generate_tailored_resume(resume_text, job_text),
+                self.generate_cover_letter(resume_text, job_text)
+            )
+            return {"resume": resume_content, "cover_letter": cover_letter_content}
+        
+        resume_part, cover_part = sections
+        pack = {
+            "resume": self._strip_preamble(resume_part, "tailored resume"),
+            "cover_letter": self._strip_preamble(cover_part, "cover letter")
+        }
+        
+        # Later single-document requests for the same inputs are served from cache
+        self._cache_put(self.generate_tailored_resume.cache_key(self, resume_text, job_text), pack["resume"])
+        self._cache_put(self.generate_cover_letter.cache_key(self, resume_text, job_text), pack["cover_letter"])
+        
+        return pack
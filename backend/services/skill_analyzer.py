@@ -1,8 +1,56 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+import bisect
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+class _ResumeSkillIndex:
+    """Normalized resume skills and the search structures used for partial matching"""
+    
+    def __init__(self, resume_skills: List[str]):
+        # Normalize skills for comparison (lowercase), mapping back to the original case;
+        # the key view acts as a set, so each skill is normalized only once
+        self.skills_map = {skill.lower().strip(): skill for skill in resume_skills}
+        self.skills_lower = self.skills_map.keys()
+        
+        self.candidates = [skill for skill in self.skills_lower if len(skill) > 3]
+        if not self.candidates:
+            return
+        
+        # Job skill contained in a resume skill: one C-level find over all
+        # candidates joined by newlines (skills never contain one)
+        self.haystack = "\n".join(self.candidates)
+        self.starts = []
+        offset = 0
+        for skill in self.candidates:
+            self.starts.append(offset)
+            offset += len(skill) + 1
+        
+        # Resume skill contained in a job skill: one regex alternation
+        self.contained = re.compile("|".join(re.escape(skill) for skill in self.candidates))
+    
+    def find_similar(self, job_skill: str) -> Optional[str]:
+        """
+        Find a resume skill that contains, or is contained in, a job skill
+        
+        Args:
+            job_skill: Normalized job skill
+            
+        Returns:
+            The normalized resume skill, or None if there is no partial match
+        """
+        if not self.candidates or len(job_skill) <= 3:
+            return None
+        
+        pos = self.haystack.find(job_skill)
+        if pos != -1 and "\n" not in job_skill:
+            return self.candidates[bisect.bisect_right(self.starts, pos) - 1]
+        
+        found = self.contained.search(job_skill)
+        return found.group(0) if found else None
+
 class SkillAnalyzer:
     """Service for analyzing skill gaps between resume and job requirements"""
     
@@ -21,39 +69,79 @@ class SkillAnalyzer:
         Returns:
             Dictionary with matching, missing, and partial skills
         """
-        # Normalize skills for comparison (lowercase)
-        job_skills_lower = {skill.lower().strip() for skill in job_skills}
-        resume_skills_lower = {skill.lower().strip() for skill in resume_skills}
+        # Nothing required, so there is no gap and no need to index the resume
+        if not job_skills:
+            return {"matching_skills": [], "missing_skills": [], "partial_skills": []}
+        
+        # Copy the lists so callers can't modify the cached result
+        result = SkillAnalyzer._analyze_skill_gap_cached(tuple(job_skills), tuple(resume_skills))
+        return {key: list(skills) for key, skills in result.items()}
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _analyze_skill_gap_cached(job_skills: Tuple[str, ...], resume_skills: Tuple[str, ...]) -> Dict[str, List[str]]:
+        """
+        Memoized analyze_skill_gap, so the same job and resume skill lists are compared only once
         
-        # Create mapping for original case
+        The returned dict is shared between calls and must not be modified.
+        """
+        return SkillAnalyzer._analyze_against_index(list(job_skills), _ResumeSkillIndex(list(resume_skills)))
+    
+    @staticmethod
+    def analyze_skill_gap_batch(
+        job_skills_list: List[List[str]],
+        resume_skills: List[str]
+    ) -> List[Dict[str, List[str]]]:
+        """
+        Analyze the gap between one resume and several jobs
+        
+        The resume skills are normalized and indexed once and shared by every job.
+        
+        Args:
+            job_skills_list: Skill lists, one per job description
+            resume_skills: List of skills from resume
+            
+        Returns:
+            One analyze_skill_gap result per job, in the same order
+        """
+        index = _ResumeSkillIndex(resume_skills)
+        return [SkillAnalyzer._analyze_against_index(job_skills, index) for job_skills in job_skills_list]
+    
+    @staticmethod
+    def _analyze_against_index(job_skills: List[str], index: _ResumeSkillIndex) -> Dict[str, List[str]]:
+        """Compare job skills with an indexed resume"""
         job_skills_map = {skill.lower().strip(): skill for skill in job_skills}
-        resume_skills_map = {skill.lower().strip(): skill for skill in resume_skills}
+        job_skills_lower = job_skills_map.keys()
         
         # Find exact matches
-        matching = job_skills_lower.intersection(resume_skills_lower)
+        matching = job_skills_lower & index.skills_lower
         matching_skills = [job_skills_map[skill] for skill in matching]
         
         # Find missing skills (in job but not in resume)
-        missing = job_skills_lower - resume_skills_lower
-        missing_skills = [job_skills_map[skill] for skill in missing]
+        missing = job_skills_lower - index.skills_lower
+        
+        # Every job skill matched exactly
+        if not missing:
+            return {"matching_skills": matching_skills, "missing_skills": [], "partial_skills": []}
         
         # Find partial matches (similar skills)
-        partial_skills = []
+        partial_pairs = []
+        partial_matched = set()
         for job_skill in missing:
-            for resume_skill in resume_skills_lower:
-                if (job_skill in resume_skill or resume_skill in job_skill) and \
-                   len(job_skill) > 3 and len(resume_skill) > 3:
-                    partial_skills.append(f"{job_skills_map[job_skill]} (similar to {resume_skills_map[resume_skill]})")
-                    break
+            resume_skill = index.find_similar(job_skill)
+            if resume_skill is None:
+                continue
+            
+            partial_pairs.append((job_skills_map[job_skill], index.skills_map[resume_skill]))
+            partial_matched.add(job_skill)
         
-        # Remove partial matches from missing skills
-        partial_base_skills = [skill.split(' (similar')[0] for skill in partial_skills]
-        missing_skills = [skill for skill in missing_skills if skill not in partial_base_skills]
+        # Missing skills exclude those with a partial match
+        missing_skills = [job_skills_map[skill] for skill in missing if skill not in partial_matched]
         
         return {
             "matching_skills": matching_skills,
             "missing_skills": missing_skills,
-            "partial_skills": partial_skills
+            "partial_skills": [f"{job_skill} (similar to {resume_skill})" for job_skill, resume_skill in partial_pairs]
         }
     
     @staticmethod
@@ -76,8 +164,10 @@ class SkillAnalyzer:
         if total_required == 0:
             return 0.0
         
-        # Weight exact matches at 100% and partial matches at 50%
-        weighted_match = matching_count + (partial_count * 0.5)
-        percentage = (weighted_match / total_required) * 100
+        # Weight exact matches at 100% and partial matches at 50%, computed exactly in
+        # integer hundredths of a percent and rounded half to even like round()
+        hundredths, remainder = divmod((2 * matching_count + partial_count) * 5000, total_required)
+        if 2 * remainder > total_required or (2 * remainder == total_required and hundredths % 2):
+            hundredths += 1
         
-        return round(min(percentage, 100.0), 2)
+        return min(hundredths, 10000) / 100
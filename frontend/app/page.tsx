@@ -71,6 +71,7 @@ export default function Home() {
             <DocumentGeneration 
               resumeFile={uploadedFiles.resume}
               jobDescriptionFile={uploadedFiles.jobDescription}
+              analysisId={analysisData?.analysis_id || null}
               onDocumentsGenerated={setGeneratedDocs}
             />
             {(generatedDocs.resumePath || generatedDocs.coverLetterPath) && (
@@ -5,10 +5,11 @@ import { useState } from "react";
 interface DocumentGenerationProps {
   resumeFile: File | null;
   jobDescriptionFile: File | null;
+  analysisId?: string | null;
   onDocumentsGenerated?: (docs: { resumePath: string; coverLetterPath: string }) => void;
 }
 
-export default function DocumentGeneration({ resumeFile, jobDescriptionFile, onDocumentsGenerated }: DocumentGenerationProps) {
+export default function DocumentGeneration({ resumeFile, jobDescriptionFile, analysisId, onDocumentsGenerated }: DocumentGenerationProps) {
   const [loadingResume, setLoadingResume] = useState(false);
   const [loadingCover, setLoadingCover] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -16,6 +17,31 @@ export default function DocumentGeneration({ resumeFile, jobDescriptionFile, onD
   const [resumePath, setResumePath] = useState("");
   const [coverPath, setCoverPath] = useState("");
 
+  // Reuse the text extracted during analysis when possible instead of re-uploading the PDFs
+  const generateDocument = async (kind: "resume" | "cover_letter", format: "docx" | "pdf") => {
+    const formData = new FormData();
+    formData.append("format", format);
+
+    if (analysisId) {
+      const response = await fetch(`http://localhost:8000/api/generate/${analysisId}/${kind}`, {
+        method: "POST",
+        body: formData,
+      });
+      // The stored analysis expires after an hour; fall back to uploading the files again
+      if (response.status !== 404) {
+        return response;
+      }
+    }
+
+    formData.append("resume", resumeFile as File);
+    formData.append("job_description", jobDescriptionFile as File);
+    const endpoint = kind === "resume" ? "generate-resume" : "generate-cover-letter";
+    return fetch(`http://localhost:8000/api/${endpoint}`, {
+      method: "POST",
+      body: formData,
+    });
+  };
+
   const handleGenerateResume = async (format: "docx" | "pdf") => {
     if (!resumeFile || !jobDescriptionFile) {
       setError("Missing required files");
@@ -27,15 +53,7 @@ export default function DocumentGeneration({ resumeFile, jobDescriptionFile, onD
     setSuccess(null);
 
     try {
-      const formData = new FormData();
-      formData.append("resume", resumeFile);
-      formData.append("job_description", jobDescriptionFile);
-      formData.append("format", format);
-
-      const response = await fetch("http://localhost:8000/api/generate-resume", {
-        method: "POST",
-        body: formData,
-      });
+      const response = await generateDocument("resume", format);
 
       if (!response.ok) {
         const errorData = await response.json();
@@ -94,15 +112,7 @@ export default function DocumentGeneration({ resumeFile, jobDescriptionFile, onD
     setSuccess(null);
 
     try {
-      const formData = new FormData();
-      formData.append("resume", resumeFile);
-      formData.append("job_description", jobDescriptionFile);
-      formData.append("format", format);
-
-      const response = await fetch("http://localhost:8000/api/generate-cover-letter", {
-        method: "POST",
-        body: formData,
-      });
+      const response = await generateDocument("cover_letter", format);
 
       if (!response.ok) {
         const errorData = await response.json();